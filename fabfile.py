@@ -50,12 +50,14 @@ def deploy():
     _update_database(source_folder, python)
     _update_static_files(source_folder)
     _run_remote_unit_tests(app_list, source_folder, python)
+    _clear_metrics(site_folder)
     _restart_nginx()
+    _clear_cache(site_folder)
 
 
 def _create_directory_structure_if_necessary(site_folder):
     run('mkdir -p %s' % site_folder)
-    for sub_folder in ('database', 'log', 'static'):
+    for sub_folder in ('cache', 'database', 'log', 'metrics', 'static'):
         run('mkdir -p %s/%s' % (site_folder, sub_folder))
 
 
@@ -102,6 +104,9 @@ def _update_database(source_folder, python):
     run('cd %s && %s manage.py migrate' % (source_folder, python))
     run('cd %s && %s manage.py makemigrations plok' % (source_folder, python))
     run('cd %s && %s manage.py migrate plok' % (source_folder, python))
+    run('cd %s && %s manage.py repair_counts' % (source_folder, python))
+    run('cd %s && %s manage.py rerender_articles' % (source_folder, python))
+    run('cd %s && %s manage.py rebuild_search_index' % (source_folder, python))
 
 
 def _update_static_files(source_folder):
@@ -114,6 +119,17 @@ def _run_remote_unit_tests(app_list, source_folder, python):
         run('cd %s && %s manage.py test %s --settings=%s.settings' % (source_folder, python, app, APP_NAME))
 
 
+def _clear_metrics(site_folder):
+    # Restarted workers start counting from zero
+    run('rm -f %s/metrics/*.json' % site_folder)
+
+
+def _clear_cache(site_folder):
+    # Pages and fragments rendered with the old code and templates. After the restart, so that old
+    # workers can't store any more of them.
+    run('find %s/cache -mindepth 1 -delete' % site_folder)
+
+
 def _restart_nginx():
     sudo('systemctl restart gunicorn-%s' % APP_NAME)
     sudo('service nginx restart')
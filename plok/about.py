@@ -1,7 +1,30 @@
 import os
+import threading
 from django.conf import settings
 from django.views.generic import TemplateView
-from markdown import markdown
+from plok.rendering import render_text
+
+_about_cache = {}  # Path -> ((mtime, size), rendered HTML). Shared by all threads of the process.
+_about_cache_lock = threading.Lock()
+
+
+def render_about(readme_path):
+    """ Rendered README. Re-read only when the file's modification time or size has changed. """
+    stat = os.stat(readme_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _about_cache.get(readme_path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    with _about_cache_lock:
+        with open(readme_path, 'r') as about_file:
+            about_text = render_text(about_file.read(), 'markdown')
+        _about_cache[readme_path] = (key, about_text)
+    return about_text
+
+
+def clear_about_cache():
+    _about_cache.clear()
 
 
 class AboutView(TemplateView):
@@ -11,10 +34,5 @@ class AboutView(TemplateView):
         context = super(AboutView, self).get_context_data(**kwargs)
         context['message'] = self.request.GET.get('message', '')
         readme_path = os.path.join(settings.BASE_DIR, 'README.md')
-        about_file = open(readme_path, 'r')
-        about_content = about_file.read()
-        about_file.close()
-        about_text = markdown(about_content)
-
-        context['about_text'] = about_text
+        context['about_text'] = render_about(readme_path)
         return context
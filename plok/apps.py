@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+class PlokConfig(AppConfig):
+    name = 'plok'
+
+    def ready(self):
+        from plok import signals  # noqa: F401 Connects signal handlers
+        from plok.search import create_search_index_after_migrate
+        from plok.sqlite import configure_sqlite
+        from plok.timing import install_query_timer
+        post_migrate.connect(create_search_index_after_migrate, sender=self)
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_timer)
@@ -0,0 +1,64 @@
+"""
+Zip archive of a blog, generated while it is being sent (see BlogExport). Articles are read with a
+database iterator and compressed one at a time into a small buffer that is handed to the response
+after every file, so memory use doesn't grow with the size of the blog.
+"""
+import json
+import zipfile
+from plok.models import Article
+
+EXTENSIONS = {'markdown': 'md', 'html': 'html'}
+ARTICLE_FIELDS = ('name', 'title', 'description', 'language', 'format', 'created', 'edited')
+
+
+class _Buffer:
+    """ Write-only file for ZipFile. Without tell() and seek() zipfile streams, writing sizes after the data. """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def article_path(name, text_format):
+    return 'articles/{}.{}'.format(name, EXTENSIONS.get(text_format, 'txt'))
+
+
+def blog_archive(blog, chunk_size=20):
+    """
+    Bytes of a zip file with every article of blog as a Markdown or HTML file under articles/, and
+    manifest.json describing the blog and its articles. Yields after each file.
+    """
+    articles = Article.objects.filter(blog=blog).order_by('created', 'id')
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, text_format, text in articles.values_list('name', 'format', 'text').iterator(chunk_size):
+            archive.writestr(article_path(name, text_format), text or '')
+            yield buffer.take()
+
+        # Written one article at a time too, from a second pass over the articles. The blog object is
+        # left open so that the list of articles can follow.
+        with archive.open('manifest.json', 'w') as manifest:
+            manifest.write(json.dumps({
+                'name': blog.name, 'title': blog.title, 'description': blog.description, 'language': blog.language,
+                'created': blog.created.isoformat(), 'edited': blog.edited.isoformat(),
+            })[:-1].encode('utf8') + b', "articles": [')
+            for number, values in enumerate(articles.values_list(*ARTICLE_FIELDS).iterator(chunk_size)):
+                entry = dict(zip(ARTICLE_FIELDS, values))
+                entry['created'] = entry['created'].isoformat()
+                entry['edited'] = entry['edited'].isoformat()
+                entry['file'] = article_path(entry['name'], entry['format'])
+                manifest.write((', ' if number else '').encode('utf8') + json.dumps(entry).encode('utf8'))
+                if len(buffer.chunks) > chunk_size:
+                    yield buffer.take()
+            manifest.write(b']}')
+    yield buffer.take()
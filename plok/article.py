@@ -1,18 +1,29 @@
 import logging
-from markdown import markdown
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponseRedirect, HttpResponseNotAllowed, Http404
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import gettext
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from plok.cache import AnonymousPageCacheMixin
+from plok.conditional import ConditionalGetMixin, article_state, article_list_state
 from plok.models import Blog, Article
+from plok.pagination import KeysetPaginationMixin
+from plok.routers import ReplicaReadsMixin
 
 
-class ArticleList(ListView):
+class ArticleList(ReplicaReadsMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Article
     context_object_name = 'article_list'
 
+    def conditional_state(self):
+        return article_list_state()
+
+    def get_queryset(self):
+        # Everything the list template touches comes in the same query. Article bodies are not shown here.
+        return Article.objects.select_related('blog', 'created_by').defer('text', 'html')
+
     def get_context_data(self, **kwargs):
         context = super(ArticleList, self).get_context_data(**kwargs)
         context['message'] = self.request.GET.get('message', '')
@@ -22,15 +33,21 @@ class ArticleList(ListView):
         return context
 
 
-class ArticleDetail(DetailView):
+class ArticleDetail(ReplicaReadsMixin, AnonymousPageCacheMixin, ConditionalGetMixin, DetailView):
     model = Article
     slug_field = 'name'
     context_object_name = 'article'
     blog = None
 
+    def page_cache_dependencies(self):
+        return [('blog', self.kwargs['blog_name']), ('article', self.kwargs['slug'])]
+
+    def conditional_state(self):
+        return article_state(self.kwargs['blog_name'], self.kwargs['slug'])
+
     def get_queryset(self):
         self.blog = get_object_or_404(Blog, name=self.kwargs['blog_name'])
-        return Article.objects.filter(blog=self.blog)
+        return Article.objects.filter(blog=self.blog).select_related('blog', 'created_by')
 
     def get_context_data(self, **kwargs):
         context = super(ArticleDetail, self).get_context_data(**kwargs)
@@ -38,10 +55,10 @@ class ArticleDetail(DetailView):
         context['description'] = self.object.description
         context['message'] = self.request.GET.get('message', '')
         context['can_edit'] = self.object.can_edit(self.request.user)
-        if self.object.format == 'markdown':
-            context['content'] = markdown(self.object.text)
-        else:
-            context['content'] = self.object.text
+        context['content'] = self.object.html  # Rendered on save, see Article.render
+        # Only loaded when the comments fragment of the template isn't cached (see plok_cache)
+        context['comments'] = SimpleLazyObject(self.object.comment_thread)
+        context['comment_count'] = self.object.comment_count
         return context
 
 
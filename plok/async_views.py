@@ -0,0 +1,167 @@
+import os
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.translation import gettext
+from django.views import View
+from plok.about import render_about
+from plok.cache import (AnonymousPageCacheMixin, cached_page_response, has_pending_messages, is_page_cacheable,
+                        page_cache_key, store_page, store_timeout)
+from plok.conditional import (aarticle_list_state, aarticle_state, ablog_state, conditional_response,
+                              set_conditional_headers)
+from plok.models import Blog, Article, Comment, thread_comments
+from plok.pagination import apaginate_keyset
+from plok.routers import use_replica_for
+from plok.timing import timed
+
+# Async versions of the read-only views, used when serving through ASGI (see plokkeri/asgi.py). They
+# render the same templates with the same context as their sync counterparts in plok.article,
+# plok.blog and plok.about, and share the replica routing, page cache and conditional GET logic.
+# Queries use the async ORM. Loading the session and user has no async API in this Django version,
+# so that runs in one sync_to_async call before anything else.
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    async for obj in queryset.filter(**kwargs)[:1]:
+        return obj
+    raise Http404('No {} matches the given query.'.format(queryset.model._meta.object_name))
+
+
+def _load_user(request):
+    """
+    Resolve request.user, and with it the session and messages, in a thread. Returns whether the page may
+    be cached and whether it may be answered with 304 Not Modified.
+    """
+    request.user.is_authenticated
+    return is_page_cacheable(request), not has_pending_messages(request)
+
+
+class AsyncReadView(View):
+    """
+    GET handler of the async views. Subclasses give template_name and get_context_data(), and for the
+    page cache and conditional GET page_cache_dependencies() and conditional_state() like the sync views.
+    """
+    template_name = None
+    page_cache_timeout = AnonymousPageCacheMixin.page_cache_timeout
+
+    def page_cache_dependencies(self):
+        return None  # Not cached
+
+    async def conditional_state(self):
+        return None  # No conditional GET
+
+    async def get_context_data(self):
+        return {'view': self, 'message': self.request.GET.get('message', '')}
+
+    async def get(self, request, *args, **kwargs):
+        use_replica_for(request)
+        cacheable, conditional = await sync_to_async(_load_user)(request)
+
+        # The page cache is only read and written synchronously: it lives in process memory or local
+        # files, and a lookup is much cheaper than handing it to a thread.
+        dependencies = self.page_cache_dependencies()
+        key = page_cache_key(request, dependencies) if cacheable and dependencies else None
+        if key is not None:
+            cached = cached_page_response(request, key)
+            if cached is not None:
+                return cached
+            timeout = store_timeout(self.page_cache_timeout)
+
+        etag = last_modified = None
+        if conditional:
+            response, etag, last_modified = conditional_response(request, await self.conditional_state())
+            if response is not None:
+                return response
+
+        context = await self.get_context_data()
+        with timed('template'):
+            response = render(request, self.template_name, context)
+        set_conditional_headers(request, response, etag, last_modified)
+        if key is not None:
+            response['X-Plok-Cache'] = 'MISS'
+            if response.status_code == 200:
+                store_page(key, response, timeout)
+        return response
+
+
+class AsyncArticleList(AsyncReadView):
+    template_name = 'plok/article_list.html'
+    paginate_by = 50
+
+    async def conditional_state(self):
+        return await aarticle_list_state()
+
+    async def get_context_data(self):
+        context = await super(AsyncArticleList, self).get_context_data()
+        articles = Article.objects.select_related('blog', 'created_by').defer('text', 'html')
+        page = await apaginate_keyset(articles, self.request.GET, self.paginate_by)
+        context['paginator'] = None
+        context['page_obj'] = page
+        context['is_paginated'] = page.has_other_pages()
+        context['object_list'] = context['article_list'] = page.object_list
+        context['page'] = "blogs"
+        context['title'] = gettext("Articles")
+        context['can_add'] = self.request.user.is_superuser
+        return context
+
+
+class AsyncArticleDetail(AsyncReadView):
+    template_name = 'plok/article_detail.html'
+
+    def page_cache_dependencies(self):
+        return [('blog', self.kwargs['blog_name']), ('article', self.kwargs['slug'])]
+
+    async def conditional_state(self):
+        return await aarticle_state(self.kwargs['blog_name'], self.kwargs['slug'])
+
+    async def get_context_data(self):
+        context = await super(AsyncArticleDetail, self).get_context_data()
+        blog = await aget_object_or_404(Blog.objects.all(), name=self.kwargs['blog_name'])
+        article = await aget_object_or_404(Article.objects.select_related('blog', 'created_by'),
+                                           blog=blog, name=self.kwargs['slug'])
+        # Loaded even when the comments fragment is cached: templates render outside the async ORM
+        comments = [comment async for comment in Comment.objects.filter(article=article).select_related(
+            'created_by').order_by('created', 'id')]
+        for comment in comments:
+            comment.article = article  # As in Article.comment_thread
+        context['object'] = context['article'] = article
+        context['title'] = article.title
+        context['description'] = article.description
+        context['can_edit'] = article.can_edit(self.request.user)
+        context['content'] = article.html
+        context['comments'] = thread_comments(comments)
+        context['comment_count'] = article.comment_count
+        return context
+
+
+class AsyncBlogDetail(AsyncReadView):
+    template_name = 'plok/blog_detail.html'
+    paginate_by = 50
+
+    def page_cache_dependencies(self):
+        return [('blog', self.kwargs['slug']), ('blog-articles', self.kwargs['slug'])]
+
+    async def conditional_state(self):
+        return await ablog_state(self.kwargs['slug'])
+
+    async def get_context_data(self):
+        context = await super(AsyncBlogDetail, self).get_context_data()
+        blog = await aget_object_or_404(Blog.objects.select_related('created_by'), name=self.kwargs['slug'])
+        articles = blog.articles().select_related('blog', 'created_by').defer('text', 'html')
+        page = await apaginate_keyset(articles, self.request.GET, self.paginate_by)
+        context['object'] = context['blog'] = blog
+        context['title'] = blog.title
+        context['can_edit'] = blog.can_edit(self.request.user)
+        context['page_obj'] = page
+        context['articles'] = page.object_list
+        return context
+
+
+class AsyncAboutView(AsyncReadView):
+    template_name = 'plok/about.html'
+
+    async def get_context_data(self):
+        context = await super(AsyncAboutView, self).get_context_data()
+        context['about_text'] = render_about(os.path.join(settings.BASE_DIR, 'README.md'))
+        return context
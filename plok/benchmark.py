@@ -0,0 +1,126 @@
+"""
+In-process benchmark of the plok views against a synthetic dataset in a throwaway test database.
+Run with ./manage.py benchmark, see plok/management/commands/benchmark.py.
+"""
+import contextlib
+import statistics
+import time
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from plok import synthetic
+from plok.models import Blog, Article, Comment
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'plok-benchmark',
+    }
+}
+
+
+@contextlib.contextmanager
+def benchmark_database(verbosity=0, name=None):
+    """
+    Create and migrate a throwaway test database and a private cache, leaving real data alone.
+    SQLite test databases are in memory unless a file name is given.
+    """
+    test_settings = connection.settings_dict['TEST']
+    default_name = test_settings.get('NAME')
+    with override_settings(CACHES=BENCHMARK_CACHES):
+        test_settings['NAME'] = name or default_name
+        old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            cache.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+            test_settings['NAME'] = default_name
+
+
+def seed(blogs=5, articles=20, comments=20, paragraphs=30, seed=0):
+    """ Create blogs x articles x comments by one user, Markdown and HTML articles mixed """
+    synthetic.generate(seed=seed, blogs=blogs, articles=articles, comments=comments, prefix='benchmark', users=1,
+                       paragraphs=paragraphs, text_pool=20, vary=False)
+    return auth.get_user_model().objects.get(username='benchmark-user-0')
+
+
+class Scenario:
+    def __init__(self, name, url, logged_in=False, method='get', data=None):
+        self.name = name
+        self.url = url
+        self.logged_in = logged_in
+        self.method = method
+        self.data = data
+
+
+def default_scenarios():
+    blog = Blog.objects.order_by('id').first()
+    article = Article.objects.filter(blog=blog).order_by('id').first()
+    comment = Comment.objects.filter(article=article).order_by('id').first()
+    article_args = [blog.name, article.name]
+    return [
+        Scenario('article_list', reverse('plok:article_list')),
+        Scenario('blog_list', reverse('plok:blog_list')),
+        Scenario('blog_detail', reverse('plok:blog', args=[blog.name])),
+        Scenario('blog_detail_user', reverse('plok:blog', args=[blog.name]), logged_in=True),
+        Scenario('article_detail', reverse('plok:article', args=article_args)),
+        Scenario('article_detail_user', reverse('plok:article', args=article_args), logged_in=True),
+        Scenario('comment_create', reverse('plok:comment_create', args=article_args), logged_in=True),
+        Scenario('comment_update', reverse('plok:comment_update', args=article_args + [comment.id]),
+                 logged_in=True),
+        Scenario('about', reverse('plok:about')),
+        Scenario('search', reverse('plok:search') + '?q=sauna+lake'),
+    ]
+
+
+def percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(scenario, user, iterations=100, warmup=5, host='localhost'):
+    client = Client(HTTP_HOST=host)
+    if scenario.logged_in:
+        client.force_login(user)
+    request = getattr(client, scenario.method)
+    for i in range(warmup):
+        response = request(scenario.url, scenario.data)
+        assert response.status_code == 200, '{} returned {}'.format(scenario.url, response.status_code)
+
+    timings = []
+    queries = 0
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            request(scenario.url, scenario.data)
+            timings.append(time.perf_counter() - start)
+        queries = max(queries, len(captured))
+
+    timings.sort()
+    return {
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'requests_per_second': len(timings) / sum(timings),
+        'queries': queries,
+    }
+
+
+def find_regressions(results, baseline, latency_tolerance=1.5):
+    """ Messages for scenarios that run more queries or are slower (p50) than baseline allows """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append('{}: {} queries, baseline {}'.format(name, result['queries'], expected['queries']))
+        if result['p50_ms'] > expected['p50_ms'] * latency_tolerance:
+            regressions.append('{}: p50 {:.2f} ms, baseline {:.2f} ms (tolerance {}x)'.format(
+                name, result['p50_ms'], expected['p50_ms'], latency_tolerance))
+    return regressions
@@ -1,16 +1,25 @@
 import logging
 
 from django.urls import reverse, reverse_lazy
-from django.http import HttpResponseRedirect, Http404
+from django.http import HttpResponseRedirect, Http404, StreamingHttpResponse
 from django.utils.translation import gettext
-from django.views.generic import ListView, DetailView
+from django.views.generic import ListView, DetailView, View
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from plok.archive import blog_archive
+from plok.cache import AnonymousPageCacheMixin
+from plok.conditional import ConditionalGetMixin, blog_state
 from plok.models import Blog
+from plok.pagination import KeysetPaginationMixin, paginate_keyset
+from plok.routers import ReplicaReadsMixin
 
 
-class BlogList(ListView):
+class BlogList(ReplicaReadsMixin, KeysetPaginationMixin, ListView):
     model = Blog
     context_object_name = 'blog_list'
+    keyset_descending = False  # Oldest blogs first
+
+    def get_queryset(self):
+        return Blog.objects.select_related('created_by')
 
     def get_context_data(self, **kwargs):
         context = super(BlogList, self).get_context_data(**kwargs)
@@ -21,18 +30,29 @@ class BlogList(ListView):
         return context
 
 
-class BlogDetail(DetailView):
+class BlogDetail(ReplicaReadsMixin, AnonymousPageCacheMixin, ConditionalGetMixin, DetailView):
     model = Blog
+    queryset = Blog.objects.select_related('created_by')
     slug_field = 'name'
     fields = ['name', 'title', 'description']
     context_object_name = 'blog'
+    paginate_by = 50
+
+    def page_cache_dependencies(self):
+        return [('blog', self.kwargs['slug']), ('blog-articles', self.kwargs['slug'])]
+
+    def conditional_state(self):
+        return blog_state(self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super(BlogDetail, self).get_context_data(**kwargs)
         context['title'] = self.object.title
         context['message'] = self.request.GET.get('message', '')
         context['can_edit'] = self.object.can_edit(self.request.user)
-        context['articles'] = self.object.articles()
+        articles = self.object.articles().select_related('blog', 'created_by').defer('text', 'html')
+        page = paginate_keyset(articles, self.request.GET, self.paginate_by)
+        context['page_obj'] = page
+        context['articles'] = page.object_list
         return context
 
 
@@ -79,7 +99,7 @@ class BlogDelete(DeleteView):
 
     def render_to_response(self, context, **response_kwargs):
         if self.object.can_edit(self.request.user):
-            if self.object.articles().count() == 0:
+            if not self.object.articles().exists():
                 return super(BlogDelete, self).render_to_response(context, **response_kwargs)
 
         return HttpResponseRedirect(reverse('plok:blog', args=[object.name]))
@@ -87,8 +107,20 @@ class BlogDelete(DeleteView):
     def get_object(self):
         blog = super(BlogDelete, self).get_object()
         if blog.can_edit(self.request.user):
-            if blog.articles().count() == 0:
+            # Not article_count, which is for display and may have drifted
+            if not blog.articles().exists():
                 return blog
 
         # Todo: Smarter way to handle this
         raise Http404
+
+
+class BlogExport(View):
+    """ Download the blog's articles as a zip file, streamed as it is compressed """
+    def get(self, request, *args, **kwargs):
+        blog = Blog.objects.select_related('created_by').filter(name=kwargs['slug']).first()
+        if blog is None or not blog.can_edit(request.user):
+            raise Http404
+        response = StreamingHttpResponse(blog_archive(blog), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="{}.zip"'.format(blog.name)
+        return response
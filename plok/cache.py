@@ -0,0 +1,163 @@
+import hashlib
+import re
+import time
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from plok.metrics import collect
+from plok.routers import reading_from_replica, replica_lag
+
+# Every cached page depends on a few generations, e.g. ('article', article.name). Saving or deleting
+# an object bumps its generations (see plok.signals), which moves dependent pages to new cache keys.
+# Generations are timestamps, so a generation that was evicted from the cache can never come back
+# with an old value.
+GENERATION_KEY = 'plok:gen:{}:{}'
+PAGE_KEY = 'plok:page:v2:{}'
+FRAGMENT_KEY = 'plok:fragment:{}'
+
+CSRF_TOKEN_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = '\x00plok-csrf-token\x00'
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+# The query parameters cached pages vary by. Requests with any other parameter are not cached, so
+# made-up query strings can't fill the cache with copies of the same page.
+PAGE_QUERY_PARAMS = ('after', 'before')
+
+# Parts of a cached fragment shown only to one user (e.g. edit links of their own comments) are stored
+# between these markers and cut out per request, see personalize_fragment.
+OWNER_START = '\x00plok-owner:{}\x00'
+OWNER_END = '\x00/plok-owner\x00'
+OWNER_RE = re.compile(r'\x00plok-owner:(\d*)\x00(.*?)\x00/plok-owner\x00', re.DOTALL)
+
+
+def bump_generation(kind, name):
+    cache.set(GENERATION_KEY.format(kind, name), time.time_ns(), None)
+
+
+def get_generations(dependencies):
+    """ Current generation for each (kind, name) dependency """
+    keys = [GENERATION_KEY.format(kind, name) for kind, name in dependencies]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def page_cache_stats():
+    """
+    Hits and misses of all workers, as counted by MetricsMiddleware from the X-Plok-Cache header.
+    Not kept in the cache itself: with the file based cache every write scans the cache directory.
+    """
+    counts = collect(getattr(settings, 'PLOK_METRICS_DIR', None))['page_cache']
+    hits = counts.get('HIT', 0)
+    misses = counts.get('MISS', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def has_pending_messages(request):
+    """ Pending messages are rendered into the page, so it differs from the cached or previous one """
+    return len(messages.get_messages(request)) > 0
+
+
+def is_page_cacheable(request):
+    if request.method != 'GET' or request.user.is_authenticated:
+        return False
+    if not set(request.GET) <= set(PAGE_QUERY_PARAMS):
+        return False
+
+    return not has_pending_messages(request)
+
+
+def page_cache_key(request, dependencies):
+    parts = [translation.get_language(), request.META.get('SERVER_NAME', ''), request.META.get('SERVER_PORT', ''),
+             request.path] + [request.GET.get(param, '') for param in PAGE_QUERY_PARAMS]
+    parts += [str(generation) for generation in get_generations(dependencies)]
+    return PAGE_KEY.format(hashlib.md5('\n'.join(parts).encode('utf8')).hexdigest())
+
+
+class AnonymousPageCacheMixin:
+    """
+    Cache complete responses of anonymous GET requests, varied by language, path and PAGE_QUERY_PARAMS.
+    Views list the objects a page depends on in page_cache_dependencies(). CSRF tokens are swapped out
+    of stored pages and a fresh token for the current client is put back on every hit.
+    """
+    page_cache_timeout = getattr(settings, 'PLOK_PAGE_CACHE_TIMEOUT', 24 * 60 * 60)
+
+    def page_cache_dependencies(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_page_cacheable(request):
+            return super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+
+        key = page_cache_key(request, self.page_cache_dependencies())
+        cached = cached_page_response(request, key)
+        if cached is not None:
+            return cached
+
+        timeout = store_timeout(self.page_cache_timeout)
+        response = super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+        response['X-Plok-Cache'] = 'MISS'
+        if response.status_code == 200:
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(lambda rendered: self._store_page(key, rendered, timeout))
+            else:
+                self._store_page(key, response, timeout)
+        return response
+
+    def _store_page(self, key, response, timeout):
+        store_page(key, response, timeout)
+
+
+def cached_page_response(request, key):
+    """ Response for the page stored under key, or None """
+    cached = cache.get(key)
+    if cached is None:
+        return None
+
+    content, headers = cached
+    response = HttpResponse(content.replace(CSRF_PLACEHOLDER, get_token(request)), headers=headers)
+    response['X-Plok-Cache'] = 'HIT'
+    return get_conditional_response(request, etag=headers.get('ETag'),
+                                    last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+                                    response=response)
+
+
+def store_timeout(timeout):
+    """ How long to keep a page rendered now. Decide before rendering, as the view picks the database. """
+    if reading_from_replica():
+        # A lagging replica may not have the change that moved the page to this key yet
+        return min(timeout, replica_lag())
+    return timeout
+
+
+def store_page(key, response, timeout):
+    content = CSRF_TOKEN_RE.sub(r'\g<1>{}\g<2>'.format(CSRF_PLACEHOLDER), response.content.decode(response.charset))
+    headers = {header: response[header] for header in STORED_HEADERS if response.has_header(header)}
+    cache.set(key, (content, headers), timeout)
+
+
+# Fragments of pages that look the same to every user are cached for logged-in users too. A fragment
+# depends on the same generations as its page, so any write to the article, its comments or its blog
+# moves it to a new key.
+
+def fragment_cache_key(name, dependencies):
+    parts = [translation.get_language(), name] + [str(generation) for generation in get_generations(dependencies)]
+    return FRAGMENT_KEY.format(hashlib.md5('\n'.join(parts).encode('utf8')).hexdigest())
+
+
+def mark_owner_only(owner_id, content):
+    return OWNER_START.format(owner_id or '') + content + OWNER_END
+
+
+def personalize_fragment(content, user):
+    """ Keep the owner-only parts of a fragment that belong to user, drop the rest """
+    user_id = str(user.pk) if user.is_authenticated else None
+    return OWNER_RE.sub(lambda match: match.group(2) if match.group(1) == user_id else '', content)
@@ -0,0 +1,134 @@
+import datetime
+import hashlib
+from django.db.models import Max
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from plok.cache import get_generations, has_pending_messages
+from plok.models import Blog, Article
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs with 304 Not Modified before the view queries or renders anything.
+    Views return the data their page depends on from conditional_state(), fetched with cheap aggregate
+    queries. The ETag also covers the user and language, because pages show per-user edit controls.
+    Last-Modified is the newest edited timestamp in the state. Pages with pending messages are always
+    rendered in full.
+    """
+    _conditional_state = None
+
+    def conditional_state(self):
+        """ Tuple of values identifying the current page content or None if the page does not exist """
+        raise NotImplementedError
+
+    def _get_conditional_state(self):
+        if self._conditional_state is None:
+            self._conditional_state = (self.conditional_state(),)
+        return self._conditional_state[0]
+
+    def _etag(self, request, *args, **kwargs):
+        return state_etag(request, self._get_conditional_state())
+
+    def _last_modified(self, request, *args, **kwargs):
+        return state_last_modified(self._get_conditional_state())
+
+    def dispatch(self, request, *args, **kwargs):
+        if has_pending_messages(request):
+            return super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs)
+        view = condition(etag_func=self._etag, last_modified_func=self._last_modified)(
+            super(ConditionalGetMixin, self).dispatch)
+        return view(request, *args, **kwargs)
+
+
+def state_etag(request, state):
+    if state is None:
+        return None
+    parts = [request.user.pk, translation.get_language()] + list(state)
+    return hashlib.md5(repr(parts).encode('utf8')).hexdigest()
+
+
+def state_last_modified(state):
+    if state is None:
+        return None
+    timestamps = [value for value in state if isinstance(value, datetime.datetime)]
+    return max(timestamps) if timestamps else None
+
+
+def conditional_response(request, state):
+    """
+    For async views, which can't use the condition decorator: (304/412 response or None, ETag,
+    Last-Modified timestamp). Headers are set on the final response with set_conditional_headers.
+    """
+    etag = state_etag(request, state)
+    etag = quote_etag(etag) if etag else None
+    last_modified = state_last_modified(state)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+
+def set_conditional_headers(request, response, etag, last_modified):
+    """ Same headers as the condition decorator adds """
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
+
+
+def _first(queryset):
+    rows = list(queryset[:1])
+    return rows[0] if rows else None
+
+
+async def _afirst(queryset):
+    async for row in queryset[:1]:
+        return row
+    return None
+
+
+def _article_state_query(blog_name, article_name):
+    return Article.objects.filter(blog__name=blog_name, name=article_name).values_list(
+        'edited', 'blog__edited', 'comment_count'
+    ).annotate(comments_edited=Max('comment__edited')).order_by()
+
+
+def _blog_state_query(blog_name):
+    return Blog.objects.filter(name=blog_name).values_list('edited', 'article_count').annotate(
+        articles_edited=Max('article__edited')
+    ).order_by()
+
+
+def article_state(blog_name, article_name):
+    return _first(_article_state_query(blog_name, article_name))
+
+
+async def aarticle_state(blog_name, article_name):
+    return await _afirst(_article_state_query(blog_name, article_name))
+
+
+def blog_state(blog_name):
+    return _first(_blog_state_query(blog_name))
+
+
+async def ablog_state(blog_name):
+    return await _afirst(_blog_state_query(blog_name))
+
+
+def article_list_state():
+    # Counting articles would read the whole table on every request. The ('articles', 'all') generation
+    # changes on any article or blog change including deletes (see plok.signals), and MAX(edited) is
+    # an index lookup.
+    generation = get_generations([('articles', 'all')])[0]
+    articles = Article.objects.aggregate(edited=Max('edited'))
+    blogs = Blog.objects.aggregate(edited=Max('edited'))
+    return generation, articles['edited'], blogs['edited']
+
+
+async def aarticle_list_state():
+    generation = get_generations([('articles', 'all')])[0]
+    articles = await Article.objects.aaggregate(edited=Max('edited'))
+    blogs = await Blog.objects.aaggregate(edited=Max('edited'))
+    return generation, articles['edited'], blogs['edited']
@@ -0,0 +1,108 @@
+import hashlib
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse_lazy
+from django.utils import translation
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import gettext_lazy
+from plok.cache import get_generations
+from plok.models import Blog, Article
+
+FEED_KEY = 'plok:feed:{}'
+
+
+class CachedFeed(Feed):
+    """
+    Feed cached until one of its cache_dependencies() changes (see plok.cache). The ETag is derived from
+    the dependency generations, so a poll answered with 304 costs a couple of cache lookups and no queries.
+    """
+    item_count = 20
+    cache_timeout = 24 * 60 * 60
+
+    def cache_dependencies(self, **kwargs):
+        return [('articles', 'all')]
+
+    def __call__(self, request, *args, **kwargs):
+        parts = [type(self).__name__, translation.get_language(), request.get_host(), request.path]
+        parts += [str(generation) for generation in get_generations(self.cache_dependencies(**kwargs))]
+        digest = hashlib.md5('\n'.join(parts).encode('utf8')).hexdigest()
+        key = FEED_KEY.format(digest)
+        etag = quote_etag(digest)
+        cached = cache.get(key)
+        if cached is None:
+            response = super(CachedFeed, self).__call__(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.content, response['Content-Type'], response.get('Last-Modified')),
+                          self.cache_timeout)
+        else:
+            content, content_type, last_modified = cached
+            response = HttpResponse(content, content_type=content_type)
+            if last_modified:
+                response['Last-Modified'] = last_modified
+        response['ETag'] = etag
+        return get_conditional_response(request, etag=etag,
+                                        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+                                        response=response)
+
+    def articles(self):
+        return Article.objects.select_related('blog', 'created_by').order_by('-created', '-id')
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.html  # Rendered when the article was saved
+
+    def item_pubdate(self, item):
+        return item.created
+
+    def item_updateddate(self, item):
+        return item.edited
+
+    def item_author_name(self, item):
+        return item.created_by.username
+
+
+class LatestArticlesFeed(CachedFeed):
+    title = 'Plokkeri'
+    link = reverse_lazy('plok:index')
+    description = gettext_lazy('Latest articles')
+
+    def items(self):
+        return self.articles()[:self.item_count]
+
+
+class LatestArticlesAtomFeed(LatestArticlesFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestArticlesFeed.description
+
+
+class BlogArticlesFeed(CachedFeed):
+    def cache_dependencies(self, slug=None, **kwargs):
+        return [('blog', slug), ('blog-articles', slug)]
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Blog, name=slug)
+
+    def title(self, blog):
+        return blog.title
+
+    def link(self, blog):
+        return blog.get_absolute_url()
+
+    def description(self, blog):
+        return blog.description or blog.title
+
+    def items(self, blog):
+        return self.articles().filter(blog=blog)[:self.item_count]
+
+
+class BlogArticlesAtomFeed(BlogArticlesFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, blog):
+        return blog.description
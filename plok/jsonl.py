@@ -0,0 +1,266 @@
+"""
+Streaming export and import of blogs, articles and comments as JSON lines, for moving content between
+environments without holding it in memory like dumpdata and loaddata. See ./manage.py export_plok and
+./manage.py import_plok.
+
+The first line identifies the format, every other line is one row, e.g. {"type":"comment","id":7,...}.
+Rows keep their ids and timestamps, users are referred to by username. Blogs come first, then articles,
+then comments, each in id order, so a reply always comes after the comment it replies to.
+"""
+import datetime
+import itertools
+import json
+import operator
+import orjson
+from django.contrib import auth
+from django.db import connection, transaction
+from plok.cache import bump_generation
+from plok.models import Blog, Article, Comment, recount_articles, recount_comments
+from plok.search import deferred_search_index
+from plok.synthetic import deferred_indexes, insert_rows, reset_sequences
+
+FORMAT = 'plok-jsonl'
+VERSION = 1
+USER_FIELDS = ('created_by', 'edited_by')
+DATETIME_FIELDS = ('created', 'edited')
+TABLES = {
+    'blog': (Blog, ('id', 'name', 'title', 'description', 'language', 'created', 'created_by', 'edited',
+                    'edited_by')),
+    'article': (Article, ('id', 'blog', 'name', 'title', 'description', 'text', 'language', 'format', 'html',
+                          'renderer_version', 'created', 'created_by', 'edited', 'edited_by')),
+    'comment': (Comment, ('id', 'article', 'reply_to', 'text', 'created', 'created_by', 'edited', 'edited_by')),
+}
+# Fields that tell whether a row with the id of an exported row is the same row, imported before, or
+# another one that happens to have the same id
+NATURAL_KEYS = {'blog': ('name',), 'article': ('name',), 'comment': ('article', 'created')}
+# References checked by the importer, which turns off foreign key enforcement of the database for speed.
+# Users are looked up or created by the importer itself.
+REFERENCES = {'blog': (), 'article': (('blog', Blog),), 'comment': (('article', Article), ('reply_to', Comment))}
+# Denormalized counters aren't exported. Rows are inserted with zero counts, recounted after the import.
+COUNTER_FIELDS = {'blog': ('article_count',), 'article': ('comment_count',), 'comment': ()}
+LOOKUP_CHUNK = 500  # Ids per pk__in query
+
+
+def export_lines(chunk_size=2000):
+    """ Lines of an export of all blogs, articles and comments, fetched chunk_size rows at a time """
+    yield json.dumps({'format': FORMAT, 'version': VERSION})
+    for kind, (model, fields) in TABLES.items():
+        columns = [field + '__username' if field in USER_FIELDS else field for field in fields]
+        dates = [fields.index(field) for field in DATETIME_FIELDS]
+        for row in model.objects.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size):
+            row = list(row)
+            for index in dates:
+                row[index] = row[index].isoformat()
+            record = {'type': kind}
+            record.update(zip(fields, row))
+            yield json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def export(output, chunk_size=2000):
+    """ Write an export to a text file, returns rows written """
+    rows = -1  # Without the format line
+    for line in export_lines(chunk_size):
+        output.write(line)
+        output.write('\n')
+        rows += 1
+    return rows
+
+
+class Importer:
+    """
+    Insert exported rows in batches of batch_size, one transaction each. Rows that are already in the
+    database are skipped, so an interrupted import continues where it stopped when run again with the
+    same file. An id taken by a different row (see NATURAL_KEYS) is an error. Users missing from this
+    database are created without a usable password.
+    """
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.user_ids = {}  # Username -> id
+        self.counts = {'users': 0, 'blogs': 0, 'articles': 0, 'comments': 0, 'skipped': 0}
+        self.changed = {'blog': set(), 'article': set()}  # Ids of objects whose cached pages are stale
+        self.adapt = connection.ops.adapt_datetimefield_value
+        self.timezone = connection.timezone
+        self.utc = connection.timezone_name == 'UTC'
+
+    def load(self, lines):
+        """ Import lines of an export (an open file will do), returns counts of inserted and skipped rows """
+        lines = iter(lines)
+        header = json.loads(next(lines, 'null'))
+        if not isinstance(header, dict) or header.get('format') != FORMAT:
+            raise ValueError('Not a {} file'.format(FORMAT))
+        if header.get('version') != VERSION:
+            raise ValueError('Unsupported {} version {}'.format(FORMAT, header.get('version')))
+
+        with deferred_indexes(Blog, Article, Comment), deferred_search_index(), \
+                connection.constraint_checks_disabled():
+            self._load_rows(lines)
+
+        reset_sequences()
+        self._repair_counts()
+        self._invalidate_pages()
+        return self.counts
+
+    def _chunks(self, lines):
+        """
+        Lists of up to batch_size decoded rows. The lines of a chunk are decoded as one JSON array, with
+        orjson. A chunk with an error, or blank lines, is decoded line by line to tell which line it is.
+        """
+        number = 2
+        for chunk in iter(lambda: list(itertools.islice(lines, self.batch_size)), []):
+            try:
+                records = orjson.loads('[{}]'.format(','.join(chunk)))
+                valid = set(map(operator.itemgetter('type'), records)) <= TABLES.keys()
+            except (ValueError, KeyError, TypeError):
+                valid = False
+            yield records if valid else list(self._records_by_line(chunk, number))
+            number += len(chunk)
+
+    @staticmethod
+    def _records_by_line(lines, first_number):
+        for number, line in enumerate(lines, first_number):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if record['type'] not in TABLES:
+                    raise ValueError('unknown type {}'.format(record['type']))
+            except (ValueError, KeyError, TypeError) as error:
+                raise ValueError('Line {}: {}'.format(number, error))
+            yield record
+
+    def _load_rows(self, lines):
+        kind = None
+        batch = []
+        for records in self._chunks(lines):
+            for record_kind, run in itertools.groupby(records, operator.itemgetter('type')):
+                if batch and record_kind != kind:
+                    self._insert(kind, batch)
+                    batch = []
+                kind = record_kind
+                batch.extend(run)
+                while len(batch) >= self.batch_size:
+                    self._insert(kind, batch[:self.batch_size])
+                    batch = batch[self.batch_size:]
+        if batch:
+            self._insert(kind, batch)
+
+    def _insert(self, kind, batch):
+        model, fields = TABLES[kind]
+        # Ids are ascending in an export, a range query is much cheaper than pk__in with thousands of ids
+        ids = [record['id'] for record in batch]
+        natural_key = NATURAL_KEYS[kind]
+        existing = {row[0]: row[1:] for row in model.objects.filter(pk__range=(min(ids), max(ids))).values_list(
+            'pk', *[model._meta.get_field(field).attname for field in natural_key])}
+        if existing:
+            for record in batch:
+                if record['id'] in existing:
+                    self._check_same(kind, record, existing[record['id']])
+            batch = [record for record in batch if record['id'] not in existing]
+            self.counts['skipped'] += len(ids) - len(batch)
+            if not batch:
+                return
+
+        # Converted a column at a time: map() over the column, with a dict of its distinct values
+        try:
+            columns = list(zip(*map(operator.itemgetter(*fields), batch)))
+        except KeyError as error:
+            record = next(record for record in batch if not record.keys() >= set(fields))
+            raise ValueError('{} {} has no {}'.format(kind, record.get('id'), error))
+        self._check_references(kind, columns)
+        if kind == 'blog':
+            self.changed['blog'].update(columns[0])
+        else:
+            self.changed['blog' if kind == 'article' else 'article'].update(columns[1])
+        for field in USER_FIELDS:
+            index = fields.index(field)
+            for username in set(columns[index]) - self.user_ids.keys() - {None}:
+                self._user_id(username)
+            columns[index] = map(self.user_ids.get, columns[index])
+        created, edited = (fields.index(field) for field in DATETIME_FIELDS)
+        unedited = columns[edited] == columns[created]
+        columns[created] = self._adapt_datetimes(columns[created])
+        columns[edited] = columns[created] if unedited else self._adapt_datetimes(columns[edited])
+        columns.extend(itertools.repeat(0, len(batch)) for field in COUNTER_FIELDS[kind])
+        with transaction.atomic():
+            insert_rows(model, fields + COUNTER_FIELDS[kind], zip(*columns))
+        self.counts[kind + 's'] += len(batch)
+
+    @staticmethod
+    def _check_references(kind, columns):
+        """ Raise ValueError if rows of a batch refer to rows neither in the batch nor in the database """
+        model, fields = TABLES[kind]
+        for field, target in REFERENCES[kind]:
+            column = columns[fields.index(field)]
+            referenced = set(column) - {None}
+            if target is model:
+                referenced -= set(columns[0])  # Replies to comments of the same batch
+            referenced = sorted(referenced)
+            found = set()
+            for start in range(0, len(referenced), LOOKUP_CHUNK):
+                chunk = referenced[start:start + LOOKUP_CHUNK]
+                found.update(target.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+            if len(found) < len(referenced):
+                missing = min(set(referenced) - found)
+                raise ValueError('{} {} refers to {} {}, which does not exist'.format(
+                    kind, columns[0][column.index(missing)], field, missing))
+
+    def _adapt_datetimes(self, values):
+        """
+        Exported timestamps as database values: naive in the time zone of the database connection, like
+        Django stores them
+        """
+        if self.utc and all(value.endswith('+00:00') for value in values):
+            # Exported from a UTC connection too: str() of the naive value is the exported one without offset
+            return [value[:-6].replace('T', ' ') for value in values]
+        # Converting to naive first saves the adapter a settings lookup per value
+        return [self.adapt(datetime.datetime.fromisoformat(value).astimezone(self.timezone).replace(tzinfo=None))
+                for value in values]
+
+    @staticmethod
+    def _check_same(kind, record, values):
+        for field, value in zip(NATURAL_KEYS[kind], values):
+            exported = record.get(field)
+            if field in DATETIME_FIELDS and exported is not None:
+                exported = datetime.datetime.fromisoformat(exported)
+            if exported != value:
+                raise ValueError('{} {} is already taken by another {}: {} is {!r}, not {!r}'.format(
+                    kind, record['id'], kind, field, value, exported))
+
+    def _user_id(self, username):
+        if username is None:
+            return None
+        user_id = self.user_ids.get(username)
+        if user_id is None:
+            user_model = auth.get_user_model()
+            user = user_model.objects.filter(username=username).first()
+            if user is None:
+                user = user_model(username=username)
+                user.set_unusable_password()
+                user.save()
+                self.counts['users'] += 1
+            user_id = self.user_ids[username] = user.id
+        return user_id
+
+    def _repair_counts(self):
+        """ Recount articles of blogs that got articles and comments of articles that got comments """
+        for model, ids, recount in ((Blog, self.changed['blog'], recount_articles),
+                                    (Article, self.changed['article'], recount_comments)):
+            ids = sorted(ids)
+            for start in range(0, len(ids), LOOKUP_CHUNK):
+                recount(model.objects.filter(pk__in=ids[start:start + LOOKUP_CHUNK]))
+
+    def _invalidate_pages(self):
+        """ Inserted rows bypass the signals in plok.signals, so bump the generations they would have """
+        bump_generation('articles', 'all')
+        for model, ids, kinds in ((Blog, self.changed['blog'], ('blog', 'blog-articles')),
+                                  (Article, self.changed['article'], ('article',))):
+            ids = sorted(ids)
+            for start in range(0, len(ids), LOOKUP_CHUNK):
+                chunk = ids[start:start + LOOKUP_CHUNK]
+                for name in model.objects.filter(pk__in=chunk).values_list('name', flat=True):
+                    for kind in kinds:
+                        bump_generation(kind, name)
+
+
+def load(lines, batch_size=5000):
+    return Importer(batch_size).load(lines)
@@ -0,0 +1,57 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from plok import benchmark
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(benchmark.__file__), 'benchmark_baseline.json')
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway database with synthetic blogs, articles and comments, drive the plok views '
+            'in-process and report latency percentiles, throughput and SQL queries per view. Fails if a view '
+            'runs more queries than the stored baseline or its median latency exceeds it by the tolerance. '
+            'Latency baselines are machine specific: save your own with --save-baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=5)
+        parser.add_argument('--articles', type=int, default=20, help='Articles per blog')
+        parser.add_argument('--comments', type=int, default=20, help='Comments per article')
+        parser.add_argument('--iterations', type=int, default=100, help='Measured requests per view')
+        parser.add_argument('--views', nargs='*', help='Only run these scenarios')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline')
+        parser.add_argument('--latency-tolerance', type=float, default=1.5)
+
+    def handle(self, *args, **options):
+        results = {}
+        with benchmark.benchmark_database():
+            self.stdout.write('Seeding {blogs} blogs x {articles} articles x {comments} comments'.format(**options))
+            user = benchmark.seed(options['blogs'], options['articles'], options['comments'])
+            self.stdout.write('{:<22} {:>9} {:>9} {:>9} {:>9} {:>8}'.format(
+                'view', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries'))
+            for scenario in benchmark.default_scenarios():
+                if options['views'] and scenario.name not in options['views']:
+                    continue
+                result = benchmark.run_scenario(scenario, user, options['iterations'])
+                results[scenario.name] = result
+                self.stdout.write('{:<22} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} '
+                                  '{requests_per_second:>9.1f} {queries:>8}'.format(scenario.name, **result))
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline_file:
+                rounded = {name: {key: round(value, 2) for key, value in result.items()}
+                           for name, result in results.items()}
+                json.dump(rounded, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write('Baseline saved to {}'.format(options['baseline']))
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('No baseline at {}'.format(options['baseline']))
+            return
+
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = benchmark.find_regressions(results, baseline, options['latency_tolerance'])
+        if regressions:
+            raise CommandError('Regressions:\n' + '\n'.join(regressions))
+        self.stdout.write('No regressions against {}'.format(options['baseline']))
@@ -0,0 +1,32 @@
+import time
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from plok.about import AboutView, clear_about_cache
+
+
+class Command(BaseCommand):
+    help = 'Measure AboutView requests per second with and without the rendered README cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        view = AboutView.as_view()
+        factory = RequestFactory()
+
+        def run(before_each):
+            start = time.perf_counter()
+            for i in range(count):
+                before_each()
+                request = factory.get('/about/')
+                request.user = AnonymousUser()
+                view(request).render()
+            return count / (time.perf_counter() - start)
+
+        uncached = run(clear_about_cache)
+        clear_about_cache()
+        cached = run(lambda: None)
+        self.stdout.write('Uncached: {:8.1f} req/s'.format(uncached))
+        self.stdout.write('Cached:   {:8.1f} req/s ({:.1f}x)'.format(cached, cached / uncached))
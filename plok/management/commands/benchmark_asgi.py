@@ -0,0 +1,129 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from plok import benchmark
+from plok.models import Article
+
+SERVERS = {
+    'wsgi': ['plokkeri.wsgi:application'],
+    'asgi': ['plokkeri.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+# Settings of the benchmarked servers: production-like, with the seeded database, and with the page
+# cache off so that every request runs its view.
+SETTINGS_TEMPLATE = '''from plokkeri.settings import *
+DEBUG = False
+DATABASES['default'].update(NAME={database!r}, CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+CACHES = {{'default': {{'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}}
+PLOK_PAGE_CACHE_TIMEOUT = 0
+PLOK_METRICS_DIR = None
+'''
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _drive(base_url, paths, deadline, latencies, errors):
+    """ Request paths in turn until the deadline, one request at a time """
+    while time.time() < deadline:
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                errors.append(path)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    help = ('Serve a seeded throwaway SQLite database with gunicorn through WSGI (sync workers and views) '
+            'and through ASGI (uvicorn workers and plok.async_views), and compare the throughput and latency '
+            'of the article, blog and about pages under concurrent anonymous clients. Needs uvicorn.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help='gunicorn workers, as in deployment')
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per server')
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+
+    def handle(self, *args, **options):
+        if 'asgi' in options['servers']:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError('ASGI benchmark needs uvicorn: pip install -r requirements.txt')
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'benchmark.sqlite3')
+            with benchmark.benchmark_database(name=database):
+                benchmark.seed(blogs=3, articles=20, comments=20, paragraphs=10)
+                article = Article.objects.select_related('blog').order_by('id').first()
+                paths = [reverse('plok:article', args=[article.blog.name, article.name]),
+                         reverse('plok:blog', args=[article.blog.name]), reverse('plok:article_list'),
+                         reverse('plok:about')]
+                with open(os.path.join(directory, 'plok_benchmark_settings.py'), 'w') as settings_file:
+                    settings_file.write(SETTINGS_TEMPLATE.format(database=database))
+
+                self.stdout.write('{:<6} {:>8} {:>9} {:>9} {:>9} {:>7}'.format(
+                    'server', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+                for server in options['servers']:
+                    self.run_server(server, directory, paths, options)
+
+    def run_server(self, server, directory, paths, options):
+        port = _free_port()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='plok_benchmark_settings',
+                   PYTHONPATH=os.pathsep.join([directory, str(settings.BASE_DIR)]))
+        env.pop('PLOK_ASYNC_VIEWS', None)  # plokkeri/asgi.py turns the async views on
+        command = [sys.executable, '-m', 'gunicorn', '--bind', '127.0.0.1:{}'.format(port),
+                   '--workers', str(options['workers']), '--log-level', 'critical'] + SERVERS[server]
+        process = subprocess.Popen(command, cwd=str(settings.BASE_DIR), env=env)
+        base_url = 'http://127.0.0.1:{}'.format(port)
+        try:
+            self.wait_until_up(process, base_url + paths[0])
+            latencies = []
+            errors = []
+            deadline = time.time() + options['duration']
+            threads = [threading.Thread(target=_drive, args=(base_url, paths, deadline, latencies, errors))
+                       for _ in range(options['clients'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            process.terminate()
+            process.wait()
+
+        latencies.sort()
+        if not latencies:
+            latencies = [float('nan')]
+        self.stdout.write('{:<6} {:>8.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>7}'.format(
+            server, len(latencies) / options['duration'], benchmark.percentile(latencies, 50) * 1000,
+            benchmark.percentile(latencies, 95) * 1000, benchmark.percentile(latencies, 99) * 1000, len(errors)))
+
+    @staticmethod
+    def wait_until_up(process, url, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Server exited with code {}'.format(process.returncode))
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    response.read()
+                return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError('Server did not start in {} seconds'.format(timeout))
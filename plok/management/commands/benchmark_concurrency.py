@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib import auth
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from plok import benchmark
+from plok.models import Article
+
+MODES = {
+    'wal': None,  # PLOK_SQLITE_PRAGMAS from settings
+    'rollback': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},  # SQLite defaults
+}
+
+
+def _worker(task):
+    """ Read an article page or post comments until the deadline. Returns (role, latencies, errors). """
+    role, blog_name, article_name, user_id, deadline = task
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(auth.get_user_model().objects.get(pk=user_id))  # Logged in, so the page cache is skipped
+    article_url = reverse('plok:article', args=[blog_name, article_name])
+    comment_url = reverse('plok:comment_create', args=[blog_name, article_name])
+    latencies = []
+    errors = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == 'read':
+                response = client.get(article_url)
+            else:
+                response = client.post(comment_url, {'text': 'Benchmark comment'})
+        except DatabaseError:
+            errors += 1  # "database is locked" after waiting for the timeout
+            continue
+        if response.status_code in (200, 302):
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+    connections.close_all()
+    return role, latencies, errors
+
+
+class Command(BaseCommand):
+    help = ('Measure article page read throughput and latency while comments are being posted, with '
+            'reader and writer processes sharing a throwaway SQLite file database. Runs with the '
+            'PLOK_SQLITE_PRAGMAS from settings (wal) and with SQLite defaults (rollback journal) for '
+            'comparison.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Reading processes')
+        parser.add_argument('--writers', type=int, default=1, help='Comment posting processes')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode')
+        parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['rollback', 'wal'])
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            with benchmark.benchmark_database(name=os.path.join(directory, 'benchmark.sqlite3')):
+                user = benchmark.seed(blogs=2, articles=5, comments=20, paragraphs=10)
+                # Comments go to another article than the one read, so the page read stays the same size
+                read, written = Article.objects.select_related('blog').order_by('id')[:2]
+                self.stdout.write('{:<9} {:>8} {:>9} {:>9} {:>9} {:>9} {:>7}'.format(
+                    'mode', 'reads/s', 'p50 ms', 'p95 ms', 'p99 ms', 'writes/s', 'errors'))
+                for mode in options['modes']:
+                    pragmas = MODES[mode] or settings.PLOK_SQLITE_PRAGMAS
+                    with override_settings(PLOK_SQLITE_PRAGMAS=pragmas):
+                        self.run_mode(mode, read, written, user, options)
+
+    def run_mode(self, mode, read, written, user, options):
+        connections.close_all()
+        connection.ensure_connection()  # Sets journal mode, which needs no other connections open
+        connections.close_all()  # Forked workers must not share the parent's connection
+
+        workers = options['readers'] + options['writers']
+        deadline = time.time() + options['duration']
+        tasks = [('read', read.blog.name, read.name, user.pk, deadline)] * options['readers']
+        tasks += [('write', written.blog.name, written.name, user.pk, deadline)] * options['writers']
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            results = list(executor.map(_worker, tasks))
+
+        reads = sorted(latency for role, latencies, errors in results if role == 'read' for latency in latencies)
+        writes = sum(len(latencies) for role, latencies, errors in results if role == 'write')
+        errors = sum(errors for role, latencies, errors in results)
+        if not reads:
+            reads = [float('nan')]
+        self.stdout.write('{:<9} {:>8.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.1f} {:>7}'.format(
+            mode, len(reads) / options['duration'], benchmark.percentile(reads, 50) * 1000,
+            benchmark.percentile(reads, 95) * 1000, benchmark.percentile(reads, 99) * 1000,
+            writes / options['duration'], errors))
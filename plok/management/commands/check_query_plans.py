@@ -0,0 +1,69 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from plok import benchmark
+from plok.models import Article, Comment
+
+LARGE_TABLES = (Article._meta.db_table, Comment._meta.db_table)
+SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+def full_scans(sql):
+    """
+    Large tables that the query plan of sql reads completely. "SEARCH ..." is an index lookup and
+    fine. "SCAN ..." is only fine when it walks an index in the wanted order and stops at a LIMIT:
+    a plain scan, or a scan followed by sorting in a temporary b-tree, reads every row.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        details = [row[-1] for row in cursor.fetchall()]
+    sorts = any(detail.startswith('USE TEMP B-TREE') for detail in details)
+    scans = []
+    for detail in details:
+        match = SCAN_RE.match(detail)
+        if not match or match.group(1) not in LARGE_TABLES:
+            continue
+        if 'USING' in detail and not sorts and ' LIMIT ' in sql:
+            continue
+        scans.append(match.group(1))
+    return scans
+
+
+class Command(BaseCommand):
+    help = ('Request every view of the benchmark (see ./manage.py benchmark) from a throwaway database, '
+            'run EXPLAIN QUERY PLAN on each SELECT they make, and fail if any of them reads all of '
+            'plok_article or plok_comment. SQLite only.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=3)
+        parser.add_argument('--articles', type=int, default=10, help='Articles per blog')
+        parser.add_argument('--comments', type=int, default=10, help='Comments per article')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN is SQLite specific')
+
+        problems = []
+        checked = 0
+        with benchmark.benchmark_database():
+            user = benchmark.seed(options['blogs'], options['articles'], options['comments'], paragraphs=3)
+            for scenario in benchmark.default_scenarios():
+                client = Client(HTTP_HOST='localhost')
+                if scenario.logged_in:
+                    client.force_login(user)
+                with CaptureQueriesContext(connection) as captured:
+                    getattr(client, scenario.method)(scenario.url, scenario.data)
+                for query in captured:
+                    if not query['sql'].startswith('SELECT'):
+                        continue
+                    checked += 1
+                    for table in full_scans(query['sql']):
+                        problems.append('{}: full scan of {}\n  {}'.format(scenario.name, table, query['sql']))
+
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError('{} of {} queries scan a whole table'.format(len(problems), checked))
+        self.stdout.write('Checked {} queries, no full table scans'.format(checked))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from plok import jsonl
+
+
+class Command(BaseCommand):
+    help = ('Export all blogs, articles and comments as JSON lines, streamed with constant memory. '
+            'Load with ./manage.py import_plok.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='File to write, - for standard output')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            for line in jsonl.export_lines(options['chunk_size']):
+                self.stdout.write(line)
+            return
+        with open(options['output'], 'w', encoding='utf8') as output:
+            rows = jsonl.export(output, options['chunk_size'])
+        self.stdout.write('Exported {} rows to {}'.format(rows, options['output']))
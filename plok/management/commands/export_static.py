@@ -0,0 +1,168 @@
+import datetime
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+from plok.models import Blog, Article
+from plok.pagination import EPOCH
+
+# Freshness of each exported page from the last run: url -> [modified, article or comment count]. Page
+# timestamps don't change when articles or comments are deleted, the counts do.
+STATE_FILE = '.plok-export.json'
+PAGE_FILES = ('index.html', 'index.html.gz')
+# Forms that POST with the exporting client's CSRF token, like the language switch. Visitors served the
+# static file don't have the matching cookie, so the forms could only fail.
+CSRF_FORM_RE = re.compile(rb'<form\b(?:(?!</form>).)*?name="csrfmiddlewaretoken".*?</form>\s*', re.S)
+
+_client = None
+
+
+def _init_worker(host, language):
+    global _client
+    _client = Client(HTTP_HOST=host, SERVER_NAME=host, SERVER_PORT='443')
+    _client.cookies.load({settings.LANGUAGE_COOKIE_NAME: language})
+
+
+def _render_page(task):
+    """ Render one URL to output_dir/<url>/index.html. Returns (url, status). """
+    url, path, modified, compress = task
+    response = _client.get(url, secure=True)
+    if response.status_code != 200:
+        return url, response.status_code
+
+    content = CSRF_FORM_RE.sub(b'', response.content)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    files = [(path, content)]
+    if compress:
+        files.append((path + '.gz', gzip.compress(content, mtime=(modified or 0) // 10 ** 9)))
+    for file_path, data in files:
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'wb') as output:
+            output.write(data)
+        if modified:
+            os.utime(temp_path, ns=(modified, modified))
+        os.replace(temp_path, file_path)
+    return url, 200
+
+
+def _read_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE)) as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(path + '.tmp', 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(path + '.tmp', path)
+
+
+def _prune(output_dir, urls):
+    """ Remove pages whose URLs are no longer exported, and directories left empty. Returns pages removed. """
+    paths = {os.path.normpath(os.path.join(output_dir, url.lstrip('/'))) for url in urls}
+    removed = 0
+    for root, dirs, files in os.walk(output_dir, topdown=False):
+        if os.path.normpath(root) not in paths:
+            for name in PAGE_FILES:
+                if name in files:
+                    os.remove(os.path.join(root, name))
+                    removed += name == 'index.html'
+        if root != output_dir and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+
+def _timestamp(*values):
+    """ Latest of given datetimes in nanoseconds, for comparing with file modification times exactly """
+    values = [value for value in values if value]
+    if not values:
+        return None
+    return (max(values) - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+
+
+class Command(BaseCommand):
+    help = ('Render blog, article, list and about pages as anonymous user into a directory tree that nginx '
+            'can serve directly (<url>/index.html). Only the first page of paginated lists is exported, and '
+            'pages whose edited timestamps and article or comment counts have not changed since the last '
+            'export are skipped. Pages of deleted blogs and articles are removed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir')
+        parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Number of rendering processes')
+        parser.add_argument('--gzip', action='store_true', help='Also write index.html.gz for nginx gzip_static')
+        parser.add_argument('--force', action='store_true', help='Render unchanged pages too')
+        parser.add_argument('--host', default=settings.ALLOWED_HOSTS[0])
+        parser.add_argument('--language', default=settings.LANGUAGE_CODE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        old_state = _read_state(options['output_dir'])
+        state = {}
+        tasks = []
+        skipped = 0
+        for url, modified, count in self.pages():
+            path = os.path.join(options['output_dir'], url.lstrip('/'), 'index.html')
+            state[url] = [modified, count]
+            if (not options['force'] and modified and old_state.get(url) == state[url] and os.path.exists(path)
+                    and os.stat(path).st_mtime_ns == modified):
+                skipped += 1
+                continue
+            tasks.append((url, path, modified, options['gzip']))
+
+        if options['jobs'] > 1 and len(tasks) > 1:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            chunk_size = max(1, len(tasks) // (options['jobs'] * 4))
+            with ProcessPoolExecutor(options['jobs'], mp_context=context, initializer=_init_worker,
+                                     initargs=(options['host'], options['language'])) as executor:
+                results = list(executor.map(_render_page, tasks, chunksize=chunk_size))
+        else:
+            _init_worker(options['host'], options['language'])
+            results = [_render_page(task) for task in tasks]
+
+        failed = [(url, status) for url, status in results if status != 200]
+        for url, status in failed:
+            self.stderr.write('{} {}'.format(status, url))
+            del state[url]  # Rendered again next time
+        removed = _prune(options['output_dir'], state)
+        _write_state(options['output_dir'], state)
+        self.stdout.write('Rendered {} pages, skipped {} unchanged, removed {} in {:.1f} s'.format(
+            len(results) - len(failed), skipped, removed, time.perf_counter() - start))
+        if failed:
+            raise CommandError('{} pages failed'.format(len(failed)))
+
+    @staticmethod
+    def pages():
+        """
+        (url, last modified time in nanoseconds or None if unknown, number of articles or comments shown)
+        for every exported page
+        """
+        yield reverse('plok:index'), None, None  # Lists and about page are cheap, always re-render them
+        yield reverse('plok:article_list'), None, None
+        yield reverse('plok:blog_list'), None, None
+        yield reverse('plok:about'), None, None
+
+        blogs = Blog.objects.annotate(articles_edited=Max('article__edited')).values_list(
+            'name', 'edited', 'articles_edited', 'article_count')
+        for name, edited, articles_edited, article_count in blogs.iterator():
+            yield reverse('plok:blog', args=[name]), _timestamp(edited, articles_edited), article_count
+
+        articles = Article.objects.annotate(comments_edited=Max('comment__edited')).values_list(
+            'blog__name', 'name', 'edited', 'blog__edited', 'comments_edited', 'comment_count')
+        for blog_name, name, edited, blog_edited, comments_edited, comment_count in articles.iterator():
+            yield (reverse('plok:article', args=[blog_name, name]), _timestamp(edited, blog_edited, comments_edited),
+                   comment_count)
@@ -0,0 +1,47 @@
+import time
+from django.conf import settings
+from django.contrib import auth
+from django.core.management.base import BaseCommand, CommandError
+from plok import synthetic
+from plok.models import Blog
+
+
+class Command(BaseCommand):
+    help = ('Bulk insert synthetic users, blogs, articles and threaded comments for load testing. Output only '
+            'depends on --seed, so runs are reproducible. Counts per blog and per article vary around the '
+            'given means. 100 blogs x 100 articles x 100 comments makes about a million comments.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=100)
+        parser.add_argument('--articles', type=int, default=100, help='Mean articles per blog')
+        parser.add_argument('--comments', type=int, default=100, help='Mean comments per article')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic', help='Prefix of generated blog, article and user names')
+        languages = [code for code, name in settings.LANGUAGES]
+        parser.add_argument('--languages', nargs='+',
+                            default=sorted(languages, key=lambda code: code != settings.LANGUAGE_CODE),
+                            help='Language codes, the first one is the most common (default: every language in '
+                                 'LANGUAGES, LANGUAGE_CODE first)')
+        parser.add_argument('--paragraphs', type=int, default=30, help='Mean paragraphs per article')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per transaction')
+
+    def handle(self, *args, **options):
+        known = {code for code, name in settings.LANGUAGES}
+        unknown = [code for code in options['languages'] if code not in known]
+        if unknown:
+            raise CommandError('Unknown languages: {}'.format(', '.join(unknown)))
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed')
+        prefix = options['prefix']
+        if (auth.get_user_model().objects.filter(username__startswith='{}-user-'.format(prefix)).exists()
+                or Blog.objects.filter(name__startswith='{}-'.format(prefix)).exists()):
+            raise CommandError('Users or blogs named {}-... exist already, use another --prefix'.format(prefix))
+
+        start = time.perf_counter()
+        counts = synthetic.generate(
+            seed=options['seed'], blogs=options['blogs'], articles=options['articles'],
+            comments=options['comments'], prefix=options['prefix'], users=options['users'],
+            languages=options['languages'], paragraphs=options['paragraphs'], batch_size=options['batch_size'])
+        self.stdout.write('Created {users} users, {blogs} blogs, {articles} articles and {comments} comments'.format(
+            **counts) + ' in {:.1f} s'.format(time.perf_counter() - start))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from plok import jsonl
+
+
+class Command(BaseCommand):
+    help = ('Import blogs, articles and comments from a file written by ./manage.py export_plok, keeping ids '
+            'and timestamps. Rows already in the database are skipped, so an interrupted import can simply '
+            'be run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='JSON lines file')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per transaction')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['input'], encoding='utf8') as lines:
+                counts = jsonl.load(lines, options['batch_size'])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        except IntegrityError as error:
+            raise CommandError('Conflicts with existing content: {}'.format(error))
+        self.stdout.write('Imported {blogs} blogs, {articles} articles and {comments} comments, created {users} '
+                          'users, skipped {skipped} existing rows'.format(**counts) +
+                          ' in {:.1f} s'.format(time.perf_counter() - start))
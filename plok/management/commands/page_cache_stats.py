@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from plok.cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counts of the anonymous page cache, summed over all workers (see plok.metrics)'
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        self.stdout.write('Hits:      {hits}\nMisses:    {misses}\nHit ratio: {hit_ratio:.1%}'.format(**stats))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from plok.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create the article full-text search index if needed and re-index all articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index(options['database']):
+            raise CommandError('Full-text index needs SQLite and migrated plok tables')
+        self.stdout.write('Search index rebuilt')
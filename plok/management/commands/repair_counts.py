@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from plok.models import repair_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored article counts of blogs and comment counts of articles'
+
+    def handle(self, *args, **options):
+        blogs, articles = repair_counts()
+        self.stdout.write('Fixed article counts of {} blogs and comment counts of {} articles'.format(
+            blogs, articles))
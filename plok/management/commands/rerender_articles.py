@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from plok.models import Article
+from plok.rendering import RENDERER_VERSION
+
+
+class Command(BaseCommand):
+    help = 'Re-render stored article HTML produced by an older renderer version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render all articles, not just stale ones')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        articles = Article.objects.all()
+        if not options['all']:
+            articles = articles.exclude(renderer_version=RENDERER_VERSION)
+
+        batch = []
+        count = 0
+        for article in articles.only('id', 'text', 'format').iterator(chunk_size=options['batch_size']):
+            article.render()
+            batch.append(article)
+            if len(batch) >= options['batch_size']:
+                count += self._save(batch)
+                batch = []
+        count += self._save(batch)
+        self.stdout.write('Re-rendered {} articles with renderer {}'.format(count, RENDERER_VERSION))
+
+    @staticmethod
+    def _save(batch):
+        # bulk_update does not call save() so "edited" timestamps are left alone
+        Article.objects.bulk_update(batch, ['html', 'renderer_version'])
+        return len(batch)
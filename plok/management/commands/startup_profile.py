@@ -0,0 +1,75 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: import the application like a gunicorn worker does, then report the time
+# it took and the resident memory of the process.
+PROBE = '''import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': time.perf_counter() - start,
+                  'rss_kb': rss // 1024 if sys.platform == 'darwin' else rss}}))
+'''
+
+
+def parse_importtime(output):
+    """ [(module, self microseconds, cumulative microseconds)] from the stderr of python -X importtime """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():  # Not the header line
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def by_package(modules):
+    """ Own import time of modules summed by top-level package, largest first """
+    totals = {}
+    for name, self_us, cumulative_us in modules:
+        package = name.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+class Command(BaseCommand):
+    help = ('Import the WSGI application in fresh interpreters with python -X importtime and report the '
+            'start-up time, the resident memory of the process and what the imports cost by package and '
+            'by module')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default=settings.WSGI_APPLICATION.rsplit('.', 1)[0],
+                            help='Module to import (default: %(default)s)')
+        parser.add_argument('--runs', type=int, default=3, help='Processes to start, medians are reported')
+        parser.add_argument('--top', type=int, default=20, help='Packages and modules to list')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'plokkeri.settings'))
+        runs = []
+        for run in range(max(1, options['runs'])):
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(module=options['module'])],
+                                    cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise CommandError('Importing {} failed:\n{}'.format(options['module'], result.stderr[-2000:]))
+            measurement = json.loads(result.stdout.strip().splitlines()[-1])
+            runs.append((measurement['seconds'], measurement['rss_kb'], parse_importtime(result.stderr)))
+
+        runs.sort(key=lambda run: run[0])
+        seconds, rss_kb, modules = runs[len(runs) // 2]
+        self.stdout.write('{}: {:.0f} ms to import (median of {}), {:.1f} MB RSS, {} modules'.format(
+            options['module'], statistics.median(run[0] for run in runs) * 1000, len(runs),
+            statistics.median(run[1] for run in runs) / 1024, len(modules)))
+
+        self.stdout.write('\n{:<40} {:>10}'.format('package', 'self ms'))
+        for package, self_us in by_package(modules)[:options['top']]:
+            self.stdout.write('{:<40} {:>10.1f}'.format(package, self_us / 1000))
+
+        self.stdout.write('\n{:<60} {:>10} {:>10}'.format('module', 'self ms', 'total ms'))
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[2])[:options['top']]:
+            self.stdout.write('{:<60} {:>10.1f} {:>10.1f}'.format(name, self_us / 1000, cumulative_us / 1000))
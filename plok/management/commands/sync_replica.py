@@ -0,0 +1,39 @@
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from plok.routers import replicas
+
+
+class Command(BaseCommand):
+    help = ('Stand-in for database replication when trying out read replicas locally: copy the primary '
+            'SQLite database to each replica in PLOK_READ_REPLICAS with the SQLite online backup API, '
+            'once or every --interval seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Repeat every this many seconds')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        targets = [connections[alias].settings_dict for alias in replicas()]
+        if not targets:
+            raise CommandError('No replicas in PLOK_READ_REPLICAS')
+        if any(database['ENGINE'] != 'django.db.backends.sqlite3' for database in [primary] + targets):
+            raise CommandError('Only SQLite databases can be synced')
+
+        while True:
+            start = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for target in targets:
+                    destination = sqlite3.connect(target['NAME'])
+                    try:
+                        source.backup(destination)
+                    finally:
+                        destination.close()
+            finally:
+                source.close()
+            self.stdout.write('Synced {} replicas in {:.3f} s'.format(len(targets), time.perf_counter() - start))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
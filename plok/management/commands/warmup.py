@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from plok.warmup import format_report, warm_up
+
+
+class Command(BaseCommand):
+    help = ('Run the start-up warm-up of plokkeri/wsgi.py in this fresh process and show how long each '
+            'step took')
+
+    def handle(self, *args, **options):
+        self.stdout.write(format_report(warm_up()))
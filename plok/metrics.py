@@ -0,0 +1,205 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from plok import timing
+
+# Each gunicorn worker counts in memory and every few seconds writes its counters to
+# PLOK_METRICS_DIR/<pid>.json. The metrics view sums the files of all workers, so it gives the same
+# answer whichever worker serves it. Files of exited workers are kept, so that totals never go
+# down; deploy empties the directory when workers are restarted anyway.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # Seconds, +Inf bucket is implicit
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.requests = {}  # view -> [count per bucket (last is +Inf), sum of seconds]
+        self.responses = {}  # 'view status' -> count
+        self.queries = {}  # view -> total queries
+        self.page_cache = {}  # 'HIT' / 'MISS' -> count
+
+    def record(self, view, status, duration, queries, page_cache=None):
+        with self.lock:
+            histogram = self.requests.get(view)
+            if histogram is None:
+                histogram = self.requests[view] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][bisect.bisect_left(BUCKETS, duration)] += 1
+            histogram[1] += duration
+            key = '{} {}'.format(view, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+            self.queries[view] = self.queries.get(view, 0) + queries
+            if page_cache:
+                self.page_cache[page_cache] = self.page_cache.get(page_cache, 0) + 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'requests': {view: [list(counts), total] for view, (counts, total) in self.requests.items()},
+                'responses': dict(self.responses),
+                'queries': dict(self.queries),
+                'page_cache': dict(self.page_cache),
+            }
+
+    def flush(self, directory):
+        """ Atomically replace this process's file """
+        self.last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, '{}.json'.format(os.getpid()))
+        with open(path + '.tmp', 'w') as output:
+            json.dump(self.as_dict(), output)
+        os.replace(path + '.tmp', path)
+
+    def flush_if_due(self, directory, interval):
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush(directory)
+
+
+_metrics = Metrics()
+_pid = os.getpid()
+
+
+def local_metrics():
+    """ Counters of this process. Started afresh in forked workers. """
+    global _metrics, _pid
+    if os.getpid() != _pid:
+        _metrics = Metrics()
+        _pid = os.getpid()
+    return _metrics
+
+
+def _flush_at_exit():
+    directory = getattr(settings, 'PLOK_METRICS_DIR', None)
+    if directory and os.getpid() == _pid and _metrics.requests:  # Management commands record nothing
+        _metrics.flush(directory)
+
+
+atexit.register(_flush_at_exit)
+
+
+def merge(total, worker):
+    for view, (counts, seconds) in worker.get('requests', {}).items():
+        histogram = total['requests'].setdefault(view, [[0] * len(counts), 0.0])
+        histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+        histogram[1] += seconds
+    for name in ('responses', 'queries', 'page_cache'):
+        for key, value in worker.get(name, {}).items():
+            total[name][key] = total[name].get(key, 0) + value
+    return total
+
+
+def collect(directory=None):
+    """
+    Counters summed over all workers that have written to directory, or just this process. This process
+    counts from memory instead of its file, which is not written here: processes that only read, like
+    management commands, would leave a file of zeros behind.
+    """
+    metrics = local_metrics()
+    if not directory:
+        return metrics.as_dict()
+    total = merge({'requests': {}, 'responses': {}, 'queries': {}, 'page_cache': {}}, metrics.as_dict())
+    own = os.path.join(directory, '{}.json'.format(os.getpid()))
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if path == own:
+            continue
+        try:
+            with open(path) as worker_file:
+                merge(total, json.load(worker_file))
+        except (OSError, ValueError):
+            continue  # Removed or unreadable, skip it this time
+    return total
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_text(metrics):
+    """ Prometheus text exposition format """
+    lines = [
+        '# HELP plok_request_duration_seconds Request latency by view.',
+        '# TYPE plok_request_duration_seconds histogram',
+    ]
+    for view, (counts, seconds) in sorted(metrics['requests'].items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), counts):
+            cumulative += count
+            lines.append('plok_request_duration_seconds_bucket{{view="{}",le="{}"}} {}'.format(
+                _label(view), bound, cumulative))
+        lines.append('plok_request_duration_seconds_sum{{view="{}"}} {:.6f}'.format(_label(view), seconds))
+        lines.append('plok_request_duration_seconds_count{{view="{}"}} {}'.format(_label(view), cumulative))
+
+    lines += ['# HELP plok_responses_total Responses by view and status code.',
+              '# TYPE plok_responses_total counter']
+    for key, count in sorted(metrics['responses'].items()):
+        view, status = key.rsplit(' ', 1)
+        lines.append('plok_responses_total{{view="{}",status="{}"}} {}'.format(_label(view), status, count))
+
+    lines += ['# HELP plok_queries_total SQL queries by view.',
+              '# TYPE plok_queries_total counter']
+    for view, count in sorted(metrics['queries'].items()):
+        lines.append('plok_queries_total{{view="{}"}} {}'.format(_label(view), count))
+
+    hits = metrics['page_cache'].get('HIT', 0)
+    misses = metrics['page_cache'].get('MISS', 0)
+    lines += ['# HELP plok_page_cache_requests_total Anonymous page cache lookups.',
+              '# TYPE plok_page_cache_requests_total counter',
+              'plok_page_cache_requests_total{{result="hit"}} {}'.format(hits),
+              'plok_page_cache_requests_total{{result="miss"}} {}'.format(misses),
+              '# HELP plok_page_cache_hit_ratio Share of anonymous page cache lookups that were hits.',
+              '# TYPE plok_page_cache_hit_ratio gauge',
+              'plok_page_cache_hit_ratio {:.4f}'.format(hits / (hits + misses) if hits + misses else 0.0)]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status code, query count and page cache result of every request by URL name.
+    Goes right after ServerTimingMiddleware, whose query count it uses.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.directory = getattr(settings, 'PLOK_METRICS_DIR', None)
+        self.interval = getattr(settings, 'PLOK_METRICS_FLUSH_INTERVAL', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        timings = timing.current()
+        queries = timings.counts.get('sql', 0) if timings else 0
+        metrics = local_metrics()
+        metrics.record(view, response.status_code, duration, queries, response.get('X-Plok-Cache'))
+        if self.directory:
+            metrics.flush_if_due(self.directory, self.interval)
+
+
+def metrics_view(request):
+    """ Plain text metrics of all workers. Only reachable from localhost, see ansible/nginx.conf.j2. """
+    text = render_text(collect(getattr(settings, 'PLOK_METRICS_DIR', None)))
+    return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
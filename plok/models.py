@@ -1,8 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib import auth
 from django.utils.translation import gettext_lazy
 from django.conf import settings  # For available languages
 from django.urls import reverse
+from plok.rendering import RENDERER_VERSION, render_text
+
+
+def _without_counter(instance, counter, kwargs):
+    """
+    Save keyword arguments that leave the counter out of the UPDATE of an existing row. Counters only
+    change with F() updates (see plok.signals), the value in memory may be stale.
+    """
+    if not instance._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+        kwargs['update_fields'] = [field.name for field in instance._meta.concrete_fields
+                                   if not field.primary_key and field.name != counter]
+    return kwargs
 
 
 class Blog(models.Model):
@@ -17,10 +31,14 @@ class Blog(models.Model):
     edited = models.DateTimeField(auto_now=True)
     edited_by = models.ForeignKey(auth.get_user_model(), on_delete=models.SET_NULL, null=True,
                                   related_name='blog_edited_by')
+    article_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by plok.signals
 
     def articles(self):
         return Article.objects.filter(blog=self)
 
+    def save(self, *args, **kwargs):
+        super(Blog, self).save(*args, **_without_counter(self, 'article_count', kwargs))
+
     def can_edit(self, user):
         if user == self.created_by:
             return True
@@ -53,23 +71,42 @@ class Article(models.Model):
     language = models.CharField(max_length=50, choices=settings.LANGUAGES, default='en',
                                 verbose_name=gettext_lazy('language'))
     format = models.CharField(max_length=50, choices=FORMAT_CHOICES, default='html')
+    html = models.TextField(null=True, blank=True, editable=False)  # Text rendered to HTML, updated on save
+    renderer_version = models.CharField(max_length=50, blank=True, default='', editable=False)
     created = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(auth.get_user_model(), on_delete=models.CASCADE, related_name='article_created_by')
     edited = models.DateTimeField(auto_now=True)
     edited_by = models.ForeignKey(auth.get_user_model(), on_delete=models.SET_NULL, null=True,
                                   related_name='article_edited_by')
+    comment_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by plok.signals
 
     @property
     def comments(self):
         comments = Comment.objects.filter(article=self).order_by('created')
         return comments
 
+    def comment_thread(self):
+        """ All comments with their authors in one query, ordered into threads by thread_comments """
+        comments = list(Comment.objects.filter(article=self).select_related('created_by').order_by('created', 'id'))
+        for comment in comments:
+            comment.article = self  # Saves a query per comment in Comment.edit_url
+        return thread_comments(comments)
+
     def can_edit(self, user):
         if user == self.created_by:
             return True
 
         return False
 
+    def render(self):
+        self.html = render_text(self.text, self.format)
+        self.renderer_version = RENDERER_VERSION
+
+    def save(self, *args, **kwargs):
+        self.render()
+        with transaction.atomic():  # Together with the blog's article_count, see plok.signals
+            super(Article, self).save(*args, **_without_counter(self, 'comment_count', kwargs))
+
     def __unicode__(self):
         return self.blog.name + ':' + self.name
 
@@ -84,6 +121,13 @@ class Article(models.Model):
 
     class Meta:
         ordering = ['-created']  # Default ordering by points (descending)
+        indexes = [
+            # Article list and blog page, newest first with keyset pagination on (created, id).
+            # Lookups by (blog, name) are served by the unique index on name.
+            models.Index(fields=['created', 'id'], name='plok_article_created'),
+            models.Index(fields=['blog', 'created', 'id'], name='plok_article_blog_created'),
+            models.Index(fields=['edited'], name='plok_article_edited'),  # Conditional GET, MAX(edited)
+        ]
 
 
 class Comment(models.Model):
@@ -102,9 +146,76 @@ class Comment(models.Model):
 
         return False
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():  # Together with the article's comment_count, see plok.signals
+            super(Comment, self).save(*args, **kwargs)
+
     @property
     def edit_url(self):
         return reverse('plok:comment_update', args=[self.article.blog.name, self.article.name, self.id])
 
     def __str__(self):
         return '{}:{}'.format(self.article.name, self.created_by.username)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['article', 'created', 'id'], name='plok_comment_article_created'),  # Threads
+        ]
+
+
+MAX_COMMENT_INDENT = 8
+
+
+def _recount(queryset, field, related_model, related_field):
+    """ Set field of stale rows of queryset to the number of related rows, returns rows fixed """
+    actual = Coalesce(Subquery(
+        related_model.objects.filter(**{related_field: OuterRef('pk')}).order_by().values(related_field).annotate(
+            count=Count('pk')).values('count')
+    ), 0)
+    stale = queryset.annotate(actual=actual).exclude(**{field: F('actual')}).values('pk')
+    return queryset.model.objects.filter(pk__in=stale).update(**{field: actual})
+
+
+def recount_articles(blogs):
+    return _recount(blogs, 'article_count', Article, 'blog')
+
+
+def recount_comments(articles):
+    return _recount(articles, 'comment_count', Comment, 'article')
+
+
+def repair_counts():
+    """
+    Recompute all Blog.article_count and Article.comment_count values with one UPDATE each, for rows
+    inserted past the signals or counts that drifted. Returns numbers of blogs and articles fixed.
+    """
+    return recount_articles(Blog.objects.all()), recount_comments(Article.objects.all())
+
+
+def thread_comments(comments):
+    """
+    Order comments (given in creation order) so that each comment is followed by its replies.
+    Sets comment.replies, comment.depth and comment.indent (depth capped for display). O(n), no queries.
+    """
+    by_id = {}
+    for comment in comments:
+        comment.replies = []
+        by_id[comment.id] = comment
+
+    roots = []
+    for comment in comments:
+        parent = by_id.get(comment.reply_to_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.replies.append(comment)
+
+    thread = []
+    stack = [(comment, 0) for comment in reversed(roots)]
+    while stack:  # Iterative depth-first walk, so deep reply chains can't hit the recursion limit
+        comment, depth = stack.pop()
+        comment.depth = depth
+        comment.indent = min(depth, MAX_COMMENT_INDENT)
+        thread.append(comment)
+        stack.extend((reply, depth + 1) for reply in reversed(comment.replies))
+    return thread
@@ -0,0 +1,106 @@
+import datetime
+from django.db.models import Q
+from django.http import Http404
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def encode_cursor(obj):
+    """ Cursor pointing at obj in (created, id) order, e.g. '1506290000123456-42' """
+    microseconds = (obj.created - EPOCH) // datetime.timedelta(microseconds=1)
+    return '{}-{}'.format(microseconds, obj.pk)
+
+
+def decode_cursor(cursor):
+    try:
+        microseconds, pk = cursor.split('-')
+        return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(pk)
+    except (ValueError, OverflowError):
+        raise Http404('Invalid page cursor')
+
+
+class KeysetPage:
+    """ One page of objects with cursors to neighbouring pages. Used in place of Django's Page. """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _past(cursor, forward, descending):
+    """ Filter selecting rows after (forward) or before cursor in (created, id) ordering """
+    created, pk = decode_cursor(cursor)
+    if forward == descending:
+        return Q(created__lt=created) | Q(created=created, id__lt=pk)
+    return Q(created__gt=created) | Q(created=created, id__gt=pk)
+
+
+def _keyset_query(queryset, params, per_page, descending):
+    """ Query for one page plus one row to tell whether there are more, in display order unless before """
+    order = ['-created', '-id'] if descending else ['created', 'id']
+    reverse_order = [field[1:] if field.startswith('-') else '-' + field for field in order]
+    before = params.get('before')
+    after = params.get('after')
+    if before:
+        return queryset.filter(_past(before, False, descending)).order_by(*reverse_order)[:per_page + 1]
+    if after:
+        queryset = queryset.filter(_past(after, True, descending))
+    return queryset.order_by(*order)[:per_page + 1]
+
+
+def _keyset_page(rows, params, per_page):
+    if params.get('before'):
+        has_previous = len(rows) > per_page
+        object_list = rows[:per_page][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > per_page
+        object_list = rows[:per_page]
+        has_previous = bool(params.get('after'))
+
+    if not object_list:
+        return KeysetPage(object_list)
+
+    return KeysetPage(object_list,
+                      next_cursor=encode_cursor(object_list[-1]) if has_next else None,
+                      previous_cursor=encode_cursor(object_list[0]) if has_previous else None)
+
+
+def paginate_keyset(queryset, params, per_page, descending=True):
+    """
+    Paginate queryset on (created, id) using 'after' or 'before' cursor from params (request.GET).
+    Every page is a single indexed range query, so deep pages cost the same as the first one.
+    """
+    rows = list(_keyset_query(queryset, params, per_page, descending))
+    return _keyset_page(rows, params, per_page)
+
+
+async def apaginate_keyset(queryset, params, per_page, descending=True):
+    """ paginate_keyset for async views """
+    rows = [row async for row in _keyset_query(queryset, params, per_page, descending)]
+    return _keyset_page(rows, params, per_page)
+
+
+class KeysetPaginationMixin:
+    """ ListView mixin replacing offset pagination with paginate_keyset """
+    paginate_by = 50
+    keyset_descending = True
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_keyset(queryset, self.request.GET, page_size, self.keyset_descending)
+        return None, page, page.object_list, page.has_other_pages()
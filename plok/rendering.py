@@ -0,0 +1,100 @@
+import collections
+import hashlib
+import re
+import threading
+import markdown
+from django.conf import settings
+from plok.timing import timed
+
+# Stored with each rendered article. Bump the first part when rendering logic changes, then run
+# ./manage.py rerender_articles to refresh existing rows.
+RENDERER_VERSION = '1:markdown-{}'.format(markdown.__version__)
+
+# Markdown is rendered one top-level block at a time, and rendered blocks are kept in an LRU cache
+# keyed by a hash of their source. Saving an edited article then only parses the blocks that changed.
+# The joined blocks are identical to what a single markdown() pass gives, because texts are only cut
+# where Markdown itself can't continue a block:
+# - at blank lines followed by a line that starts at column 0 and can't continue a list, blockquote or
+#   indented code block, nor start a raw HTML block
+# - never in texts that have reference link definitions (they apply to the whole document) or raw HTML
+#   blocks (which may contain blank lines); those are rendered in one pass.
+BLANK_LINES_RE = re.compile(r'\n(?:[ \t]*\n)+')
+BLOCK_START_RE = re.compile(r'[^\s>*+\-\d<\[]')
+WHOLE_DOCUMENT_RE = re.compile(r'^ {0,3}(?:\[[^\]]*\]:|<)', re.MULTILINE)
+
+
+class BlockCache:
+    """ Least recently used rendered blocks, shared by all threads of the process """
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.blocks = collections.OrderedDict()  # Hash of source -> HTML
+
+    def get(self, key):
+        with self.lock:
+            html = self.blocks.get(key)
+            if html is not None:
+                self.blocks.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self.lock:
+            self.blocks[key] = html
+            self.blocks.move_to_end(key)
+            while len(self.blocks) > self.size:
+                self.blocks.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.blocks.clear()
+
+    def __len__(self):
+        return len(self.blocks)
+
+
+block_cache = BlockCache(getattr(settings, 'PLOK_MARKDOWN_BLOCK_CACHE_SIZE', 5000))
+_local = threading.local()
+
+
+def _converter():
+    """ Markdown instance of this thread. Setting one up costs more than converting a short block. """
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        converter = _local.converter = markdown.Markdown()
+    return converter.reset()
+
+
+def split_blocks(text):
+    """ Parts of text that render to the same HTML on their own as within text. Newlines normalized. """
+    blocks = []
+    start = 0
+    for match in BLANK_LINES_RE.finditer(text):
+        if BLOCK_START_RE.match(text, match.end()):
+            blocks.append(text[start:match.start()])
+            start = match.end()
+    blocks.append(text[start:])
+    return blocks
+
+
+def _render_block(block):
+    key = hashlib.sha1(block.encode('utf8')).digest()
+    html = block_cache.get(key)
+    if html is None:
+        html = _converter().convert(block)
+        block_cache.set(key, html)
+    return html
+
+
+def render_markdown(text):
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if WHOLE_DOCUMENT_RE.search(text):
+        return _converter().convert(text)
+    return '\n'.join(html for html in map(_render_block, split_blocks(text)) if html)
+
+
+def render_text(text, text_format):
+    """ Render article text in given format (see Article.FORMAT_CHOICES) to HTML """
+    if text_format == 'markdown':
+        with timed('markdown'):
+            return render_markdown(text or '')
+    return text
@@ -0,0 +1,105 @@
+import contextvars
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Reads go to a replica only while a view using ReplicaReadsMixin handles a GET or HEAD
+# from a user who hasn't written anything in the last PLOK_REPLICA_PIN_SECONDS. Everything else,
+# including all writes, uses the primary (default) database. One replica is picked per request, so its
+# reads see a single snapshot even if the replicas lag behind by different amounts.
+_replica = contextvars.ContextVar('plok_replica', default=None)
+
+PIN_COOKIE = 'plok_primary_until'
+
+
+def replicas():
+    return getattr(settings, 'PLOK_READ_REPLICAS', [])
+
+
+def replica_lag():
+    """ Seconds that replicas may lag behind the primary, also how long writers are pinned to it """
+    return getattr(settings, 'PLOK_REPLICA_PIN_SECONDS', 10)
+
+
+def reading_from_replica():
+    return _replica.get() is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_from_replica() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Replicas are copies of the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()  # Replicas get their schema from the primary
+
+
+def use_replica_for(request):
+    """ Read from a replica for the rest of this request, unless the user was pinned to the primary """
+    if request.method in ('GET', 'HEAD') and replicas() and not pinned(request):
+        _replica.set(random.choice(replicas()))
+
+
+def pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaReadsMixin:
+    """ For read-only views whose GETs may be served from a replica """
+    replica_reads = True
+
+    def dispatch(self, request, *args, **kwargs):
+        use_replica_for(request)
+        return super(ReplicaReadsMixin, self).dispatch(request, *args, **kwargs)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Limit replica reads to the request that turned them on (see ReplicaReadsMixin), and pin users to
+    the primary for a while after they have posted anything, so that they see their own changes even
+    if the replicas lag behind.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self.pin_writer(request, response)
+
+    async def __acall__(self, request):
+        token = _replica.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self.pin_writer(request, response)
+
+    @staticmethod
+    def pin_writer(request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replicas():
+            response.set_cookie(PIN_COOKIE, str(int(time.time() + replica_lag())), max_age=replica_lag(),
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,138 @@
+import contextlib
+import re
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape, strip_tags
+from django.utils.translation import gettext
+from django.views.generic import ListView
+from plok.models import Article
+
+# Full-text index of article title, description and text. On SQLite this is an FTS5 table using
+# plok_article as external content, kept up to date by triggers in the same transaction as the
+# article change itself. Created after migrations (see PlokConfig.ready). Other databases fall back
+# to a LIKE scan.
+FTS_TABLE = 'plok_article_fts'
+FTS_WEIGHTS = (10.0, 5.0, 1.0)  # bm25 weights for title, description and text
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "title, description, text, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, title, description, text) VALUES (new.id, new.title, new.description, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title, description, text) "
+    "VALUES ('delete', old.id, old.title, old.description, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF title, description, text ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title, description, text) "
+    "VALUES ('delete', old.id, old.title, old.description, old.text); "
+    "INSERT INTO {fts}(rowid, title, description, text) VALUES (new.id, new.title, new.description, new.text); "
+    "END",
+]
+
+
+def _uses_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def create_search_index(using='default'):
+    connection = connections[using]
+    if not _uses_fts(connection):
+        return False
+    if Article._meta.db_table not in connection.introspection.table_names():
+        return False  # plok not migrated yet, e.g. the first migrate of a deploy before makemigrations plok
+    with connection.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql.format(fts=FTS_TABLE, table=Article._meta.db_table))
+    return True
+
+
+def rebuild_search_index(using='default'):
+    """ Re-index all existing articles, e.g. ones created before the index existed """
+    if not create_search_index(using):
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+        cursor.execute("INSERT INTO {fts}({fts}) VALUES ('optimize')".format(fts=FTS_TABLE))
+    return True
+
+
+@contextlib.contextmanager
+def deferred_search_index(using='default'):
+    """ For bulk inserts of articles: index them all at once afterwards instead of one by one in the trigger """
+    connection = connections[using]
+    if not create_search_index(using):
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TRIGGER IF EXISTS {fts}_insert'.format(fts=FTS_TABLE))
+    try:
+        yield
+    finally:
+        rebuild_search_index(using)  # Creates the trigger again
+
+
+def create_search_index_after_migrate(sender, using='default', **kwargs):
+    create_search_index(using)
+
+
+def match_expression(query):
+    """ User input as an FTS5 query matching all words, so that operators or quotes can't cause syntax errors """
+    return ' '.join('"{}"'.format(word) for word in re.findall(r'\w+', query))
+
+
+def _highlighted(fragment):
+    fragment = escape(strip_tags(fragment or ''))
+    return fragment.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+def search_articles(query, limit=50):
+    """ Articles matching query, best first. Each has highlighted title_html and snippet_html. """
+    expression = match_expression(query)
+    if not expression:
+        return []
+
+    connection = connections[router.db_for_read(Article)]
+    if not _uses_fts(connection):
+        articles = list(Article.objects.filter(
+            Q(title__icontains=query) | Q(description__icontains=query) | Q(text__icontains=query)
+        ).select_related('blog')[:limit])
+        for article in articles:
+            article.title_html = escape(article.title)
+            article.snippet_html = escape(article.description or '')
+        return articles
+
+    sql = ("SELECT rowid, highlight({fts}, 0, %s, %s), snippet({fts}, -1, %s, %s, '…', 24) FROM {fts} "
+           "WHERE {fts} MATCH %s ORDER BY bm25({fts}, %s, %s, %s) LIMIT %s").format(fts=FTS_TABLE)
+    params = [HIGHLIGHT_START, HIGHLIGHT_END] * 2 + [expression] + list(FTS_WEIGHTS) + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    articles = Article.objects.using(connection.alias).select_related('blog').defer('text', 'html').in_bulk(
+        [row[0] for row in rows])
+    results = []
+    for article_id, title, snippet in rows:
+        article = articles.get(article_id)
+        if article:
+            article.title_html = _highlighted(title)
+            article.snippet_html = _highlighted(snippet)
+            results.append(article)
+    return results
+
+
+class SearchView(ListView):
+    template_name = 'plok/search.html'
+    context_object_name = 'results'
+
+    def get_queryset(self):
+        return search_articles(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super(SearchView, self).get_context_data(**kwargs)
+        context['title'] = gettext('Search')
+        context['query'] = self.request.GET.get('q', '')
+        return context
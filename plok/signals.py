@@ -0,0 +1,99 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from plok.cache import bump_generation
+from plok.models import Blog, Article, Comment
+
+
+@receiver(pre_save, sender=Blog)
+def remember_old_blog(sender, instance, **kwargs):
+    """ Pages cached under the old name of a renamed blog must be invalidated too """
+    instance._old_name = None
+    if instance.pk:
+        instance._old_name = Blog.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(pre_save, sender=Article)
+def remember_old_article(sender, instance, **kwargs):
+    """ Same for articles, which can also be moved to another blog """
+    instance._old_name = None
+    instance._old_blog_id = None
+    if instance.pk:
+        old = Article.objects.filter(pk=instance.pk).values_list('name', 'blog_id').first()
+        if old:
+            instance._old_name, instance._old_blog_id = old
+
+
+def _names(instance):
+    return {instance.name, getattr(instance, '_old_name', None) or instance.name}
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def blog_changed(sender, instance, **kwargs):
+    for name in _names(instance):
+        bump_generation('blog', name)
+    bump_generation('articles', 'all')  # Site-wide feed links to articles through blog names
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, **kwargs):
+    for name in _names(instance):
+        bump_generation('article', name)
+    bump_generation('articles', 'all')
+    blog_ids = {instance.blog_id, getattr(instance, '_old_blog_id', None) or instance.blog_id}
+    for blog_name in Blog.objects.filter(pk__in=blog_ids).values_list('name', flat=True):
+        bump_generation('blog-articles', blog_name)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    article_name = Article.objects.filter(pk=instance.article_id).values_list('name', flat=True).first()
+    if article_name:
+        bump_generation('article', article_name)
+
+
+# Denormalized counters. Article.save and Comment.save are atomic and so are deletes, which puts these
+# F() updates in the same transaction as the row they count. Rows inserted past the signals (bulk_create,
+# loaddata) leave a counter too low until repair_counts runs, deleting them must not take it below zero.
+
+def _add(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _deleting(origin, *models):
+    """ Whether the delete started from an instance or queryset of models, whose counters go anyway """
+    return issubclass(getattr(origin, 'model', type(origin)), models)
+
+
+@receiver(post_save, sender=Article)
+def count_saved_article(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # loaddata brings its own counts
+    old_blog_id = getattr(instance, '_old_blog_id', None)
+    if created:
+        _add(Blog, instance.blog_id, 'article_count', 1)
+    elif old_blog_id and old_blog_id != instance.blog_id:
+        _add(Blog, old_blog_id, 'article_count', -1)
+        _add(Blog, instance.blog_id, 'article_count', 1)
+
+
+@receiver(post_delete, sender=Article)
+def count_deleted_article(sender, instance, origin=None, **kwargs):
+    if not _deleting(origin, Blog):  # No need to count down a blog that is being deleted
+        _add(Blog, instance.blog_id, 'article_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _add(Article, instance.article_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if not _deleting(origin, Blog, Article):
+        _add(Article, instance.article_id, 'comment_count', -1)
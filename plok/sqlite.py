@@ -0,0 +1,16 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply PLOK_SQLITE_PRAGMAS to every new SQLite connection. With persistent connections
+    (CONN_MAX_AGE) this runs once per connection, not once per request.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'PLOK_SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
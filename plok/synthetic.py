@@ -0,0 +1,247 @@
+"""
+Deterministic synthetic blogs, articles and threaded comments for benchmarks and load testing.
+Rows are inserted with bulk_create, explicit primary keys (so replies can refer to comments in the
+same batch) and explicit timestamps, a batch per transaction. See ./manage.py generate_fixtures.
+"""
+import contextlib
+import datetime
+import random
+from django.contrib import auth
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from plok.cache import bump_generation
+from plok.models import Blog, Article, Comment
+from plok.rendering import RENDERER_VERSION, render_text
+
+WORDS = ('sauna', 'lake', 'forest', 'coffee', 'winter', 'summer', 'code', 'django', 'python', 'cabin', 'snow',
+         'boat', 'island', 'north', 'light', 'night', 'bread', 'fish', 'berry', 'road', 'house', 'river')
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)  # Fixed, so output only depends on seed
+
+
+def sentence(rnd, min_words=6, max_words=16):
+    return ' '.join(rnd.choice(WORDS) for i in range(rnd.randint(min_words, max_words))).capitalize() + '.'
+
+
+def markdown_text(rnd, paragraphs):
+    blocks = []
+    for i in range(paragraphs):
+        kind = rnd.random()
+        if kind < 0.15:
+            blocks.append('## ' + sentence(rnd, 2, 5))
+        elif kind < 0.3:
+            blocks.append('\n'.join('- ' + sentence(rnd, 3, 8) for j in range(rnd.randint(2, 5))))
+        else:
+            blocks.append(' '.join(sentence(rnd) for j in range(rnd.randint(2, 6))))
+    return '\n\n'.join(blocks)
+
+
+def html_text(rnd, paragraphs):
+    return '\n'.join('<p>{}</p>'.format(' '.join(sentence(rnd) for j in range(rnd.randint(2, 6))))
+                     for i in range(paragraphs))
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """
+    Let created/edited be set explicitly: auto_now and auto_now_add would overwrite them in bulk_create.
+    Changes the fields process wide, so only use it in commands, not while serving requests.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+COMMENT_FIELDS = ('id', 'article', 'reply_to', 'text', 'created_by', 'created', 'edited')
+
+
+def insert_rows(model, field_names, rows):
+    """
+    Insert tuples of database ready values with one executemany. Skips model instances and per-field
+    preparation of bulk_create, which take most of the time with a million comments.
+    """
+    quote = connection.ops.quote_name
+    columns = [quote(model._meta.get_field(name).column) for name in field_names]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(columns), ', '.join(['%s'] * len(columns)))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+@contextlib.contextmanager
+def deferred_indexes(*models):
+    """
+    Drop the non-unique indexes of the models' tables for a bulk insert and create them again afterwards,
+    when SQLite builds each one with a single sort instead of updating it row by row. Unique indexes stay,
+    they are constraints. Queries that would use the dropped indexes scan the tables in between. A no-op
+    on other databases.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+                       "AND tbl_name IN ({})".format(', '.join(['%s'] * len(tables))), tables)
+        indexes = [(name, sql) for name, sql in cursor.fetchall() if not sql.upper().startswith('CREATE UNIQUE')]
+        for name, sql in indexes:
+            cursor.execute('DROP INDEX {}'.format(connection.ops.quote_name(name)))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, sql in indexes:
+                cursor.execute(sql)
+
+
+def reset_sequences():
+    """ Explicit ids leave e.g. PostgreSQL sequences behind; a no-op on SQLite """
+    models = [auth.get_user_model(), Blog, Article, Comment]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+
+class Generator:
+    """
+    Article bodies and comment texts are drawn from pools generated (and rendered) once, which keeps
+    generation fast without making every row identical.
+    """
+    def __init__(self, seed=0, prefix='synthetic', users=10, languages=('en',), paragraphs=30, text_pool=200,
+                 days=365, batch_size=10000, vary=True):
+        self.rnd = random.Random(seed)
+        self.prefix = prefix
+        self.users = users
+        self.languages = list(languages)
+        self.days = days
+        self.batch_size = batch_size
+        self.vary = vary
+        self.bodies = []
+        for i in range(text_pool):
+            text_format = 'markdown' if i % 2 == 0 else 'html'
+            make_text = markdown_text if text_format == 'markdown' else html_text
+            text = make_text(self.rnd, self.rnd.randint(max(1, paragraphs // 2), paragraphs * 3 // 2 or 1))
+            self.bodies.append((text_format, text, render_text(text, text_format)))
+        self.comment_texts = [sentence(self.rnd, 5, 60) for i in range(text_pool * 5)]
+        self.counts = {'users': 0, 'blogs': 0, 'articles': 0, 'comments': 0}
+
+    def language(self):
+        # Mostly the first language, like a site with a few translated blogs
+        if len(self.languages) > 1 and self.rnd.random() < 0.3:
+            return self.rnd.choice(self.languages[1:])
+        return self.languages[0]
+
+    def count(self, mean):
+        """ Per blog and per article counts vary around the mean, unless vary is off """
+        if not self.vary or not mean:
+            return mean
+        return self.rnd.randint(mean // 2, mean * 3 // 2)
+
+    def timestamp(self, after, max_seconds):
+        return after + datetime.timedelta(seconds=self.rnd.randint(1, max(1, int(max_seconds))))
+
+    def generate(self, blogs=10, articles=100, comments=100):
+        """ blogs x articles (per blog) x comments (per article) """
+        with explicit_timestamps(auth.get_user_model(), Blog, Article, Comment):
+            user_ids = self._create_users()
+            blog_rows = self._create_blogs(blogs, user_ids)
+            self._pending_articles = []
+            self._pending_comments = []
+            article_id = _next_id(Article)
+            comment_id = _next_id(Comment)
+            span = self.days * 24 * 60 * 60
+            for blog in blog_rows:
+                blog_articles = self.count(articles)
+                created = blog.created
+                for a in range(blog_articles):
+                    created = self.timestamp(created, span / max(1, blog_articles))
+                    text_format, text, html = self.rnd.choice(self.bodies)
+                    article = Article(
+                        id=article_id, blog_id=blog.id, created_by_id=blog.created_by_id,
+                        name='{}-{}'.format(blog.name, a), title=sentence(self.rnd, 2, 8).rstrip('.'),
+                        description=sentence(self.rnd), text=text, format=text_format, html=html,
+                        renderer_version=RENDERER_VERSION, language=blog.language,
+                        created=created, edited=created)
+                    self._pending_articles.append(article)
+                    comment_id = self._add_comments(article, comment_id, comments, user_ids)
+                    article_id += 1
+                    if len(self._pending_comments) + len(self._pending_articles) >= self.batch_size:
+                        self._flush()
+                blog.article_count = blog_articles
+                Blog.objects.filter(pk=blog.id).update(article_count=blog_articles)
+            self._flush()
+            reset_sequences()
+
+        bump_generation('articles', 'all')
+        for blog in blog_rows:
+            bump_generation('blog', blog.name)
+            bump_generation('blog-articles', blog.name)
+        return self.counts
+
+    def _create_users(self):
+        user_model = auth.get_user_model()
+        first_id = _next_id(user_model)
+        users = [user_model(id=first_id + i, username='{}-user-{}'.format(self.prefix, i), password='!',
+                            date_joined=START)
+                 for i in range(self.users)]
+        user_model.objects.bulk_create(users, batch_size=self.batch_size)
+        self.counts['users'] += len(users)
+        return [user.id for user in users]
+
+    def _create_blogs(self, count, user_ids):
+        first_id = _next_id(Blog)
+        blogs = []
+        for b in range(count):
+            created = self.timestamp(START, 24 * 60 * 60)
+            blogs.append(Blog(id=first_id + b, name='{}-{}'.format(self.prefix, b),
+                              title=sentence(self.rnd, 2, 5).rstrip('.'), description=sentence(self.rnd),
+                              language=self.language(), created_by_id=self.rnd.choice(user_ids),
+                              created=created, edited=created))
+        with transaction.atomic():
+            Blog.objects.bulk_create(blogs, batch_size=self.batch_size)
+        self.counts['blogs'] += len(blogs)
+        return blogs
+
+    def _add_comments(self, article, comment_id, mean, user_ids):
+        """ Comments arrive over a few days. Most reply to one of the latest comments, the rest start threads. """
+        thread = []
+        created = article.created
+        adapt = connection.ops.adapt_datetimefield_value
+        for c in range(self.count(mean)):
+            created = self.timestamp(created, 2 * 60 * 60)
+            reply_to_id = None
+            if thread and self.rnd.random() < 0.6:
+                reply_to_id = self.rnd.choice(thread[-10:])
+            timestamp = adapt(created)
+            self._pending_comments.append((comment_id, article.id, reply_to_id, self.rnd.choice(self.comment_texts),
+                                           self.rnd.choice(user_ids), timestamp, timestamp))
+            thread.append(comment_id)
+            comment_id += 1
+        article.comment_count = len(thread)
+        return comment_id
+
+    def _flush(self):
+        with transaction.atomic():
+            Article.objects.bulk_create(self._pending_articles, batch_size=self.batch_size)
+            # Ordered by id, so a reply is never inserted before the comment it refers to
+            insert_rows(Comment, COMMENT_FIELDS, self._pending_comments)
+        self.counts['articles'] += len(self._pending_articles)
+        self.counts['comments'] += len(self._pending_comments)
+        self._pending_articles = []
+        self._pending_comments = []
+
+
+def generate(seed=0, blogs=10, articles=100, comments=100, **options):
+    return Generator(seed=seed, **options).generate(blogs, articles, comments)
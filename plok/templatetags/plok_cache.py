@@ -0,0 +1,65 @@
+"""
+{% fragment "name" %}...{% endfragment %} caches a part of a page for all users, under the
+generations the view lists in page_cache_dependencies(). Inside it, {% owner_only user_id %}...
+{% endowner_only %} marks controls that only that user sees; they are picked per request.
+"""
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from plok.cache import fragment_cache_key, mark_owner_only, personalize_fragment, store_timeout
+
+register = template.Library()
+
+IN_FRAGMENT = 'plok_fragment'
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'PLOK_FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+class FragmentNode(template.Node):
+    def __init__(self, name, nodelist):
+        self.name = name
+        self.nodelist = nodelist
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        key = fragment_cache_key(name, context['view'].page_cache_dependencies())
+        content = cache.get(key)
+        if content is None:
+            timeout = store_timeout(FRAGMENT_CACHE_TIMEOUT)
+            with context.push(**{IN_FRAGMENT: True}):  # Seen by included templates too
+                content = self.nodelist.render(context)
+            cache.set(key, content, timeout)
+        return personalize_fragment(content, context['user'])
+
+
+class OwnerOnlyNode(template.Node):
+    def __init__(self, owner_id, nodelist):
+        self.owner_id = owner_id
+        self.nodelist = nodelist
+
+    def render(self, context):
+        owner_id = self.owner_id.resolve(context)
+        if context.get(IN_FRAGMENT):
+            return mark_owner_only(owner_id, self.nodelist.render(context))
+        user = context['user']
+        if user.is_authenticated and owner_id == user.pk:
+            return self.nodelist.render(context)
+        return ''
+
+
+def _block(parser, token, node_class):
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError('{} takes one argument'.format(bits[0]))
+    nodelist = parser.parse(('end' + bits[0],))
+    parser.delete_first_token()
+    return node_class(parser.compile_filter(bits[1]), nodelist)
+
+
+@register.tag
+def fragment(parser, token):
+    return _block(parser, token, FragmentNode)
+
+
+@register.tag
+def owner_only(parser, token):
+    return _block(parser, token, OwnerOnlyNode)
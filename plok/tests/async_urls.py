@@ -0,0 +1,7 @@
+from django.urls import include, path
+from plok import urls as plok_urls
+from plokkeri import urls as site_urls
+
+# Site URLs with the async read views, as served through ASGI
+urlpatterns = [pattern for pattern in site_urls.urlpatterns if getattr(pattern, 'namespace', None) != 'plok']
+urlpatterns.append(path('', include((plok_urls.with_async_views(plok_urls.urlpatterns), 'plok'), namespace='plok')))
@@ -1,5 +1,7 @@
-from django.test import TestCase
-from django.contrib import auth
+from django.test import RequestFactory, TestCase
+from django.contrib import auth, messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpResponse
 
 
 class ExtTestCase(TestCase):
@@ -12,3 +14,11 @@ class ExtTestCase(TestCase):
         # html = response.content.decode('utf8')
         # print(html)
         return user
+
+    def add_pending_message(self, text):
+        """ As if the previous response had added a message for the next page to show """
+        storage = CookieStorage(RequestFactory().get('/'))
+        storage.add(messages.INFO, text)
+        response = HttpResponse()
+        storage.update(response)
+        self.client.cookies.update(response.cookies)
@@ -1,8 +1,10 @@
 # from unittest import skip
+from unittest import mock
 from django.test import TestCase
 from django.conf import settings
 from django.urls import reverse
 from django.contrib import auth
+from plok import article as article_views
 from plok.models import Blog, Article
 from .ext_test_case import ExtTestCase
 
@@ -27,13 +29,50 @@ class ArticleList(TestCase):
         self.client.cookies.load({settings.LANGUAGE_COOKIE_NAME: 'en-us'})
         response = self.client.get(reverse(self.url_name))
         self.assertEqual(response.context['title'], 'Articles')
-        self.assertEqual(response.context['article_list'].count(), 2)
+        self.assertEqual(len(response.context['article_list']), 2)
         # self.assertEqual(response.context['article_list'][0], article2)  # Reverse ordering can't be tested
         # self.assertEqual(response.context['article_list'][1], article1)
         self.assertEqual(response.context['message'], '')
         # self.assertEqual(response.context['can_add'], True)
         self.assertEqual(response.context['can_add'], False)
 
+    def test_cursor_pagination(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        articles = [Article.objects.create(created_by=creator, blog=blog, name="article_{}".format(i))
+                    for i in range(5)]
+        with mock.patch.object(article_views.ArticleList, 'paginate_by', 2):
+            response = self.client.get(reverse(self.url_name))
+            self.assertEqual(response.context['article_list'], [articles[4], articles[3]])
+            page = response.context['page_obj']
+            self.assertFalse(page.has_previous())
+            self.assertContains(response, '?after={}'.format(page.next_cursor))
+            response = self.client.get(reverse(self.url_name), {'after': page.next_cursor})
+            self.assertEqual(response.context['article_list'], [articles[2], articles[1]])
+            page = response.context['page_obj']
+            response = self.client.get(reverse(self.url_name), {'after': page.next_cursor})
+            self.assertEqual(response.context['article_list'], [articles[0]])
+            self.assertFalse(response.context['page_obj'].has_next())
+            response = self.client.get(reverse(self.url_name), {'before': response.context['page_obj'].previous_cursor})
+            self.assertEqual(response.context['article_list'], [articles[2], articles[1]])
+            response = self.client.get(reverse(self.url_name), {'before': response.context['page_obj'].previous_cursor})
+            self.assertEqual(response.context['article_list'], [articles[4], articles[3]])
+            self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_query_count_does_not_grow_with_articles(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        for i in range(3):
+            blog = Blog.objects.create(created_by=creator, name="test_blog_{}".format(i))
+            for j in range(10):
+                Article.objects.create(created_by=creator, blog=blog, name="article_{}_{}".format(i, j))
+        with self.assertNumQueries(3):  # Conditional GET validators (2) and the page
+            response = self.client.get(reverse(self.url_name))
+        self.assertEqual(len(response.context['article_list']), 30)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse(self.url_name), {'after': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
 
 class ArticlePage(ExtTestCase):
     url_name = 'plok:article'
@@ -86,6 +125,16 @@ class ArticlePage(ExtTestCase):
         self.assertEqual(response.context['content'], '<h1>Title</h1>')
         self.assertContains(response, '<h1>Title</h1>')
 
+    def test_does_not_render_markdown_on_view(self):
+        user = self.create_and_log_in_user()
+        blog = Blog.objects.create(created_by=user, name="test_blog")
+        article = Article.objects.create(blog=blog, created_by=user, name="test_article", title="Test article",
+                                         format='markdown', text='# Title')
+        with mock.patch('markdown.markdown') as markdown:
+            response = self.client.get(reverse(self.url_name, args=[blog.name, article.name]))
+        markdown.assert_not_called()
+        self.assertContains(response, '<h1>Title</h1>')
+
     def test_404_no_article(self):
         user = self.create_and_log_in_user()
         blog = Blog.objects.create(created_by=user, name="test_blog")
@@ -0,0 +1,84 @@
+import re
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from plok.async_views import AsyncArticleDetail
+from plok.models import Blog, Article, Comment
+from .ext_test_case import ExtTestCase
+
+CSRF_TOKEN_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _content(response):
+    return CSRF_TOKEN_RE.sub(r'\1\2', response.content.decode('utf8'))
+
+
+@override_settings(ROOT_URLCONF='plok.tests.async_urls')
+class AsyncViews(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article", text="Article text")
+        comment = Comment.objects.create(article=self.article, created_by=self.creator, text='First comment')
+        Comment.objects.create(article=self.article, created_by=self.creator, text='Reply', reply_to=comment)
+        self.article_url = reverse('plok:article', args=[self.blog.name, self.article.name])
+        self.urls = [self.article_url, reverse('plok:blog', args=[self.blog.name]), reverse('plok:article_list'),
+                     reverse('plok:index'), reverse('plok:about')]
+
+    def test_views_are_async(self):
+        self.assertTrue(AsyncArticleDetail.view_is_async)
+
+    def test_same_pages_as_sync_views(self):
+        self.create_and_log_in_user()
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            with override_settings(ROOT_URLCONF='plokkeri.urls'):
+                sync_response = self.client.get(url)
+            self.assertEqual(_content(response), _content(sync_response), url)
+            self.assertEqual(response.get('ETag'), sync_response.get('ETag'), url)
+
+    async def test_async_client(self):
+        client = AsyncClient()
+        for url in self.urls:
+            response = await client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        response = await client.get(self.article_url)
+        self.assertContains(response, 'Reply')
+        self.assertEqual(response['X-Plok-Cache'], 'HIT')
+        self.assertIn('sql;dur=', (await client.get(reverse('plok:article_list')))['Server-Timing'])
+
+        await sync_to_async(client.force_login)(self.creator)
+        response = await client.get(self.article_url)
+        self.assertContains(response, 'creator')
+        self.assertNotIn('X-Plok-Cache', response)
+
+    def test_not_found(self):
+        response = self.client.get(reverse('plok:article', args=[self.blog.name, 'missing']))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('plok:blog', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.article_url)['ETag']
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_pending_messages_are_shown(self):
+        etag = self.client.get(self.article_url)['ETag']
+        self.add_pending_message('Signed out')
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Signed out')
+
+    def test_page_cache(self):
+        self.assertEqual(self.client.get(self.article_url)['X-Plok-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.article_url)
+        self.assertEqual(response['X-Plok-Cache'], 'HIT')
+        self.assertContains(response, 'Article text')
@@ -1,8 +1,14 @@
 # from unittest import skip
+import io
+import json
+import zipfile
+from unittest import mock
 from django.conf import settings
 from django.contrib import auth
 from django.urls import reverse
 from django.test import TestCase
+from plok import blog as blog_views
+from plok.archive import blog_archive
 from plok.models import Blog, Article
 from .ext_test_case import ExtTestCase
 
@@ -24,13 +30,23 @@ class BlogList(TestCase):
         response = self.client.get(reverse(self.url_name))
         self.assertEqual(response.context['page'], 'blogs')
         self.assertEqual(response.context['title'], 'Blogs')
-        self.assertEqual(response.context['blog_list'].count(), 2)
+        self.assertEqual(len(response.context['blog_list']), 2)
         self.assertEqual(response.context['blog_list'][0], blog1)
         self.assertEqual(response.context['blog_list'][1], blog2)
         self.assertEqual(response.context['message'], '')
         # self.assertEqual(response.context['can_add'], True)
         self.assertEqual(response.context['can_add'], False)
 
+    def test_query_count_does_not_grow_with_blogs(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        for i in range(10):
+            blog = Blog.objects.create(created_by=creator, name="test_blog_{}".format(i))
+            for j in range(i):
+                Article.objects.create(created_by=creator, blog=blog, name="article_{}_{}".format(i, j))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse(self.url_name))
+        self.assertContains(response, '<td> 9 </td>')
+
 
 class BlogPage(ExtTestCase):
     url_name = 'plok:blog'
@@ -83,6 +99,31 @@ class BlogPage(ExtTestCase):
         response = self.client.get(reverse(self.url_name, args=[blog.name]))
         self.assertEqual(response.context['blog'].articles().count(), 1)
         self.assertEqual(response.context['blog'].articles()[0], article)
+        self.assertEqual(response.context['articles'], [article])
+
+    def test_query_count_does_not_grow_with_articles(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        for i in range(30):
+            Article.objects.create(blog=blog, name="article_{}".format(i), created_by=creator)
+        with self.assertNumQueries(3):  # Conditional GET validators, blog and articles
+            response = self.client.get(reverse(self.url_name, args=[blog.name]))
+        self.assertEqual(len(response.context['articles']), 30)
+
+    def test_paginates_articles(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        other = Blog.objects.create(created_by=creator, name="other_blog", title="Other blog")
+        articles = [Article.objects.create(blog=blog, name="article_{}".format(i), created_by=creator)
+                    for i in range(3)]
+        Article.objects.create(blog=other, name="other_article", created_by=creator)
+        with mock.patch.object(blog_views.BlogDetail, 'paginate_by', 2):
+            response = self.client.get(reverse(self.url_name, args=[blog.name]))
+            self.assertEqual(response.context['articles'], [articles[2], articles[1]])
+            cursor = response.context['page_obj'].next_cursor
+            response = self.client.get(reverse(self.url_name, args=[blog.name]), {'after': cursor})
+            self.assertEqual(response.context['articles'], [articles[0]])
+            self.assertFalse(response.context['page_obj'].has_next())
 
 
 class CreateBlogPage(ExtTestCase):
@@ -245,3 +286,70 @@ class DeleteBlogPage(ExtTestCase):
         self.assertEqual(Blog.objects.all().count(), 1)
         self.assertEqual(Article.objects.all().count(), 1)
         self.assertTemplateUsed(response, '404.html')
+
+    def test_cant_delete_blog_with_articles_if_count_is_stale(self):
+        user = self.create_and_log_in_user()
+        blog = Blog.objects.create(created_by=user, name="test_blog", title="Test blog", description="Testing")
+        Article.objects.create(created_by=user, blog=blog, name="test_article", title="Test article")
+        Blog.objects.update(article_count=0)
+        response = self.client.post(reverse(self.url_name, args=['test_blog']), {}, follow=True)
+        self.assertEqual(Blog.objects.all().count(), 1)
+        self.assertEqual(Article.objects.all().count(), 1)
+        self.assertTemplateUsed(response, '404.html')
+
+    def test_can_delete_blog_without_articles_if_count_is_stale(self):
+        user = self.create_and_log_in_user()
+        Blog.objects.create(created_by=user, name="test_blog", title="Test blog", description="Testing")
+        Blog.objects.update(article_count=3)
+        response = self.client.get(reverse(self.url_name, args=['test_blog']))
+        self.assertTemplateUsed(response, 'plok/blog_confirm_delete.html')
+        self.client.post(reverse(self.url_name, args=['test_blog']), {}, follow=True)
+        self.assertEqual(Blog.objects.all().count(), 0)
+
+
+class ExportBlog(ExtTestCase):
+    url_name = 'plok:blog_export'
+
+    def test_reverse_blog_export(self):
+        self.assertEqual(reverse(self.url_name, args=['test_blog']), '/plok/test_blog/export/')
+
+    def test_streams_zip_of_articles_and_manifest(self):
+        user = self.create_and_log_in_user()
+        blog = Blog.objects.create(created_by=user, name="test_blog", title="Test blog", description="Testing")
+        Article.objects.create(created_by=user, blog=blog, name="first", title="First", text="# First",
+                               format='markdown')
+        Article.objects.create(created_by=user, blog=blog, name="second", title="Second", text="<p>Second</p>")
+        response = self.client.get(reverse(self.url_name, args=[blog.name]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="test_blog.zip"')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read('articles/first.md'), b'# First')
+        self.assertEqual(archive.read('articles/second.html'), b'<p>Second</p>')
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['title'], 'Test blog')
+        self.assertEqual([article['file'] for article in manifest['articles']],
+                         ['articles/first.md', 'articles/second.html'])
+
+    def test_query_count_does_not_grow_with_articles(self):
+        user = self.create_and_log_in_user()
+        blog = Blog.objects.create(created_by=user, name="test_blog", title="Test blog")
+        for i in range(10):
+            Article.objects.create(created_by=user, blog=blog, name="article_{}".format(i), title="Article")
+        with mock.patch('plok.blog.blog_archive', wraps=lambda blog: blog_archive(blog, chunk_size=3)):
+            response = self.client.get(reverse(self.url_name, args=[blog.name]))
+        with self.assertNumQueries(2):  # One cursor per pass over the articles, read in chunks
+            content = b''.join(response.streaming_content)
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(content)).namelist()), 11)
+
+    def test_404_if_not_creator(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        self.create_and_log_in_user()
+        response = self.client.get(reverse(self.url_name, args=['test_blog']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_404_no_blog(self):
+        self.create_and_log_in_user()
+        response = self.client.get(reverse(self.url_name, args=['test_blog']))
+        self.assertEqual(response.status_code, 404)
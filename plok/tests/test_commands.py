@@ -0,0 +1,310 @@
+import collections
+import datetime
+import gc
+import gzip
+import os
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.contrib import auth
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from plok import benchmark, warmup
+from plok.management.commands.check_query_plans import full_scans
+from plok.management.commands.startup_profile import by_package, parse_importtime
+from plok.models import Blog, Article, Comment
+from plok.rendering import RENDERER_VERSION
+from plok.search import search_articles
+
+
+class RerenderArticlesTests(TestCase):
+    def test_rerenders_stale_articles(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        stale = Article.objects.create(blog=blog, created_by=creator, name="stale", format='markdown', text='*a*')
+        fresh = Article.objects.create(blog=blog, created_by=creator, name="fresh", format='markdown', text='*b*')
+        Article.objects.filter(pk=stale.pk).update(html='old', renderer_version='0')
+        Article.objects.filter(pk=fresh.pk).update(html='untouched')
+        out = StringIO()
+        call_command('rerender_articles', stdout=out)
+        self.assertIn('Re-rendered 1 articles', out.getvalue())
+        stale.refresh_from_db()
+        self.assertEqual(stale.html, '<p><em>a</em></p>')
+        self.assertEqual(stale.renderer_version, RENDERER_VERSION)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.html, 'untouched')
+
+
+class ExportStaticTests(TestCase):
+    def test_exports_pages_and_skips_unchanged(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        article = Article.objects.create(blog=blog, created_by=creator, name="test_article", title="Test article")
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command('export_static', directory, jobs=1, gzip=True, stdout=out)
+            self.assertIn('Rendered 6 pages, skipped 0', out.getvalue())
+            path = os.path.join(directory, 'plok', 'test_blog', 'test_article', 'index.html')
+            with open(path, 'rb') as page:
+                content = page.read()
+            self.assertIn(b'Test article', content)
+            self.assertNotIn(b'csrfmiddlewaretoken', content)
+            self.assertIn(b'</nav>', content)
+            with gzip.open(path + '.gz') as page:
+                self.assertEqual(page.read(), content)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'index.html')))
+
+            out = StringIO()
+            call_command('export_static', directory, jobs=1, stdout=out)
+            self.assertIn('Rendered 4 pages, skipped 2', out.getvalue())
+
+            Comment.objects.create(article=article, created_by=creator, text='New comment')
+            out = StringIO()
+            call_command('export_static', directory, jobs=1, stdout=out)
+            self.assertIn('Rendered 5 pages, skipped 1', out.getvalue())
+            with open(path, 'rb') as page:
+                self.assertIn(b'New comment', page.read())
+
+    def test_deletes_are_exported(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="b", title="Test blog")
+        kept = Article.objects.create(blog=blog, created_by=creator, name="kept", title="Kept article")
+        old = Article.objects.create(blog=blog, created_by=creator, name="old", title="Old article")
+        comment = Comment.objects.create(article=kept, created_by=creator, text='Deleted comment')
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_static', directory, jobs=1, gzip=True, stdout=StringIO())
+            old_dir = os.path.join(directory, 'plok', 'b', 'old')
+            self.assertTrue(os.path.exists(os.path.join(old_dir, 'index.html.gz')))
+
+            old.delete()
+            comment.delete()
+            out = StringIO()
+            call_command('export_static', directory, jobs=1, gzip=True, stdout=out)
+            self.assertIn('Rendered 6 pages, skipped 0 unchanged, removed 1', out.getvalue())
+            self.assertFalse(os.path.exists(old_dir))
+            with open(os.path.join(directory, 'plok', 'b', 'index.html'), 'rb') as page:
+                self.assertNotIn(b'Old article', page.read())
+            with open(os.path.join(directory, 'plok', 'b', 'kept', 'index.html'), 'rb') as page:
+                self.assertNotIn(b'Deleted comment', page.read())
+
+
+class BenchmarkTests(TestCase):
+    def test_runs_scenarios_on_seeded_data(self):
+        user = benchmark.seed(blogs=2, articles=2, comments=3, paragraphs=3)
+        self.assertEqual(Blog.objects.count(), 2)
+        self.assertEqual(Article.objects.count(), 4)
+        self.assertEqual(Comment.objects.count(), 12)
+        for scenario in benchmark.default_scenarios():
+            result = benchmark.run_scenario(scenario, user, iterations=3, warmup=1)
+            self.assertGreater(result['requests_per_second'], 0, scenario.name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_find_regressions(self):
+        baseline = {'view': {'p50_ms': 10.0, 'queries': 3}}
+        self.assertEqual(benchmark.find_regressions({'view': {'p50_ms': 14.0, 'queries': 3}}, baseline), [])
+        self.assertEqual(benchmark.find_regressions({'other': {'p50_ms': 99.0, 'queries': 9}}, baseline), [])
+        regressions = benchmark.find_regressions({'view': {'p50_ms': 16.0, 'queries': 4}}, baseline)
+        self.assertEqual(len(regressions), 2)
+
+
+class GenerateFixturesTests(TestCase):
+    def generated(self):
+        articles = list(Article.objects.order_by('id').values_list(
+            'blog__name', 'name', 'language', 'format', 'text', 'html', 'created'))
+        comments = list(Comment.objects.order_by('id').values_list(
+            'article__name', 'reply_to__text', 'text', 'created_by__username', 'created'))
+        return articles, comments
+
+    def test_generates_threaded_data_deterministically(self):
+        out = StringIO()
+        call_command('generate_fixtures', blogs=3, articles=4, comments=10, users=5, seed=1,
+                     languages=['en', 'fi'], paragraphs=3, batch_size=7, stdout=out)
+        self.assertIn('Created 5 users, 3 blogs', out.getvalue())
+        self.assertEqual(Blog.objects.count(), 3)
+        self.assertGreater(Article.objects.count(), 0)
+        self.assertEqual(Article.objects.exclude(html=None).count(), Article.objects.count())
+        self.assertGreater(Comment.objects.exclude(reply_to=None).count(), 0)
+        for blog in Blog.objects.all():
+            self.assertEqual(blog.article_count, blog.articles().count())
+        for article in Article.objects.all():
+            self.assertEqual(article.comment_count, article.comments.count())
+        for comment in Comment.objects.exclude(reply_to=None).select_related('reply_to'):
+            self.assertEqual(comment.reply_to.article_id, comment.article_id)
+            self.assertGreater(comment.created, comment.reply_to.created)
+        first = self.generated()
+
+        auth.get_user_model().objects.all().delete()
+        call_command('generate_fixtures', blogs=3, articles=4, comments=10, users=5, seed=1,
+                     languages=['en', 'fi'], paragraphs=3, batch_size=1000, stdout=StringIO())
+        self.assertEqual(self.generated(), first)
+
+    def test_site_language_is_most_common_by_default(self):
+        call_command('generate_fixtures', blogs=20, articles=0, comments=0, users=2, paragraphs=1,
+                     stdout=StringIO())
+        languages = collections.Counter(Blog.objects.values_list('language', flat=True))
+        self.assertEqual(languages.most_common(1)[0][0], settings.LANGUAGE_CODE)
+        self.assertGreater(len(languages), 1)
+        self.assertLessEqual(set(languages), {'fi', 'en'})  # Only the ones with a translation
+
+    def test_existing_prefix(self):
+        call_command('generate_fixtures', blogs=1, articles=1, comments=1, users=1, paragraphs=1, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'use another --prefix'):
+            call_command('generate_fixtures', blogs=1, articles=1, comments=1, users=1, paragraphs=1,
+                         stdout=StringIO())
+        call_command('generate_fixtures', blogs=1, articles=1, comments=1, users=1, paragraphs=1, prefix='other',
+                     stdout=StringIO())
+        self.assertEqual(Blog.objects.count(), 2)
+
+    def test_unknown_language(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_fixtures', languages=['xx'], stdout=StringIO())
+
+
+class RepairCountsTests(TestCase):
+    def test_fixes_counts_of_bulk_inserted_rows(self):
+        call_command('generate_fixtures', blogs=2, articles=3, comments=5, users=2, paragraphs=1, stdout=StringIO())
+        Blog.objects.update(article_count=0)
+        out = StringIO()
+        call_command('repair_counts', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Fixed article counts of 2 blogs and comment counts of 0 articles')
+        for blog in Blog.objects.all():
+            self.assertEqual(blog.article_count, blog.articles().count())
+
+
+class CheckQueryPlansTests(TestCase):
+    def test_full_scans(self):
+        self.assertEqual(full_scans("SELECT id FROM plok_article WHERE text = 'a'"), ['plok_article'])
+        self.assertEqual(full_scans('SELECT id FROM plok_comment ORDER BY text LIMIT 5'), ['plok_comment'])
+        self.assertEqual(full_scans('SELECT id FROM plok_article ORDER BY created DESC, id DESC LIMIT 5'), [])
+        self.assertEqual(full_scans('SELECT id FROM plok_comment WHERE article_id = 1 ORDER BY created, id'), [])
+        self.assertEqual(full_scans('SELECT MAX(edited) FROM plok_article'), [])
+        self.assertEqual(full_scans('SELECT COUNT(*) FROM auth_user'), [])
+
+
+class ExportImportTests(TestCase):
+    def content(self):
+        blogs = list(Blog.objects.order_by('id').values_list(
+            'id', 'name', 'title', 'created_by__username', 'created', 'edited', 'article_count'))
+        articles = list(Article.objects.order_by('id').values_list(
+            'id', 'blog_id', 'name', 'text', 'html', 'format', 'created', 'edited', 'edited_by__username',
+            'comment_count'))
+        comments = list(Comment.objects.order_by('id').values_list(
+            'id', 'article_id', 'reply_to_id', 'text', 'created_by__username', 'created', 'edited'))
+        return blogs, articles, comments
+
+    @staticmethod
+    def indexes():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name LIKE 'plok_%' "
+                           "ORDER BY name")
+            return [row[0] for row in cursor.fetchall()]
+
+    def export(self, directory):
+        path = os.path.join(directory, 'plok.jsonl')
+        out = StringIO()
+        call_command('export_plok', path, stdout=out)
+        self.assertIn('Exported', out.getvalue())
+        return path
+
+    def test_round_trip_keeps_ids_replies_and_timestamps(self):
+        call_command('generate_fixtures', blogs=2, articles=3, comments=10, users=3, paragraphs=2, stdout=StringIO())
+        exported = self.content()
+        indexes = self.indexes()
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.export(directory)
+            Blog.objects.all().delete()
+            auth.get_user_model().objects.filter(username='synthetic-user-2').delete()
+            out = StringIO()
+            call_command('import_plok', path, batch_size=7, stdout=out)
+        self.assertEqual(self.content(), exported)
+        self.assertIn('created 1 users, skipped 0 existing rows', out.getvalue())
+        self.assertFalse(auth.get_user_model().objects.get(username='synthetic-user-2').has_usable_password())
+        self.assertEqual(self.indexes(), indexes)  # Dropped for the import and created again
+        article = Article.objects.order_by('id').last()
+        self.assertIn(article, search_articles(article.title))
+
+    def test_interrupted_import_continues(self):
+        call_command('generate_fixtures', blogs=2, articles=3, comments=10, users=3, paragraphs=2, stdout=StringIO())
+        exported = self.content()
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.export(directory)
+            Comment.objects.filter(id__gt=Comment.objects.order_by('id')[10].id).delete()
+            Article.objects.filter(comment=None).delete()
+            kept = Blog.objects.count() + Article.objects.count() + Comment.objects.count()
+            out = StringIO()
+            call_command('import_plok', path, stdout=out)
+        self.assertEqual(self.content(), exported)
+        self.assertIn('skipped {} existing rows'.format(kept), out.getvalue())
+
+    def test_different_row_with_same_id_is_an_error(self):
+        call_command('generate_fixtures', blogs=1, articles=2, comments=2, users=2, paragraphs=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.export(directory)
+            comment = Comment.objects.order_by('id').last()
+            Comment.objects.filter(pk=comment.pk).update(created=comment.created - datetime.timedelta(days=1))
+            with self.assertRaisesMessage(CommandError, 'comment {} is already taken'.format(comment.pk)):
+                call_command('import_plok', path, stdout=StringIO())
+            Blog.objects.update(name='another-blog')
+            with self.assertRaisesMessage(CommandError, "name is 'another-blog', not 'synthetic-0'"):
+                call_command('import_plok', path, stdout=StringIO())
+        self.assertEqual(Article.objects.exclude(blog__name='another-blog').count(), 0)
+
+    def test_reference_to_missing_row_is_an_error(self):
+        call_command('generate_fixtures', blogs=1, articles=2, comments=2, users=2, paragraphs=1, stdout=StringIO())
+        indexes = self.indexes()
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.export(directory)
+            Blog.objects.all().delete()
+            with open(path) as export:
+                lines = [line for line in export if '"type":"article"' not in line]
+            with open(path, 'w') as export:
+                export.writelines(lines)
+            with self.assertRaisesMessage(CommandError, 'refers to article'):
+                call_command('import_plok', path, stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(self.indexes(), indexes)
+
+    def test_not_an_export(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as bad:
+            bad.write('{"model": "plok.blog"}\n')
+            bad.flush()
+            with self.assertRaises(CommandError):
+                call_command('import_plok', bad.name, stdout=StringIO())
+
+
+class WarmupTests(SimpleTestCase):  # No database queries allowed: connections must not outlive a fork
+    def test_reports_each_step(self):
+        out = StringIO()
+        call_command('warmup', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], [name for name, step in warmup.STEPS] + ['total'])
+        self.assertIn('article_detail.html', {name.rsplit('/', 1)[-1] for name in warmup._template_names()})
+        self.assertEqual(warmup._translations(), 'en, fi')
+
+    def test_preload_freezes_warmed_objects(self):
+        try:
+            with self.assertLogs('plok.warmup') as logs:
+                report = warmup.preload()
+            self.assertGreater(gc.get_freeze_count(), 0)
+        finally:
+            gc.unfreeze()
+        self.assertIn('templates', logs.output[0])
+        self.assertEqual(len(report), len(warmup.STEPS))
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        modules = parse_importtime('import time: self [us] | cumulative | imported package\n'
+                                   'import time:       120 |        120 |     requests.compat\n'
+                                   'import time:       300 |        420 |   requests\n'
+                                   'import time:        80 |        500 | plokkeri.wsgi\n'
+                                   'unrelated line\n')
+        self.assertEqual(modules, [('requests.compat', 120, 120), ('requests', 300, 420), ('plokkeri.wsgi', 80, 500)])
+        self.assertEqual(by_package(modules), [('requests', 420), ('plokkeri', 80)])
+
+    def test_profiles_wsgi_import(self):
+        out = StringIO()
+        call_command('startup_profile', runs=1, top=3, stdout=out)
+        self.assertRegex(out.getvalue().splitlines()[0], r'^plokkeri.wsgi: \d+ ms to import .* MB RSS')
@@ -25,6 +25,24 @@ class ArticlePageComments(ExtTestCase):
         self.assertContains(response, 'Comments: 1')
         self.assertContains(response, comment.text)
 
+    def test_replies_are_threaded_with_constant_queries(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog")
+        article = Article.objects.create(blog=blog, created_by=creator, name="test_article")
+        first = Comment.objects.create(article=article, created_by=creator, text='First')
+        second = Comment.objects.create(article=article, created_by=creator, text='Second')
+        reply = Comment.objects.create(article=article, created_by=creator, text='Reply', reply_to=first)
+        nested = Comment.objects.create(article=article, created_by=creator, text='Nested', reply_to=reply)
+        for i in range(20):
+            Comment.objects.create(article=article, created_by=creator, text='Reply {}'.format(i), reply_to=second)
+        with self.assertNumQueries(4):  # Conditional GET validators, blog, article and comments
+            response = self.client.get(reverse(self.url_name, args=[blog.name, article.name]))
+        comments = response.context['comments']
+        self.assertEqual(comments[:4], [first, reply, nested, second])
+        self.assertEqual([comment.depth for comment in comments[:5]], [0, 1, 2, 0, 1])
+        self.assertEqual(comments[0].replies, [reply])
+        self.assertContains(response, 'Comments: 24')
+
 
 class CreateCommentPage(ExtTestCase):
     url_name = 'plok:comment_create'
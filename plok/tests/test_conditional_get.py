@@ -0,0 +1,80 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.urls import reverse
+from plok.models import Blog, Article, Comment
+from .ext_test_case import ExtTestCase
+
+
+class ConditionalGet(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article")
+        self.article_url = reverse('plok:article', args=[self.blog.name, self.article.name])
+
+    def test_not_modified_without_rendering(self):
+        response = self.client.get(self.article_url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        cache.clear()  # Make sure the answer doesn't come from the page cache
+        with self.assertNumQueries(1):
+            response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, 'plok/article_detail.html')
+
+    def test_pending_messages_are_shown(self):
+        etag = self.client.get(self.article_url)['ETag']
+        self.add_pending_message('Signed out')
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Signed out')
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_from_page_cache(self):
+        etag = self.client.get(self.article_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.article_url)['Last-Modified']
+        response = self.client.get(self.article_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_change_etag(self):
+        etag = self.client.get(self.article_url)['ETag']
+        comment = Comment.objects.create(article=self.article, created_by=self.creator, text='Comment')
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        comment.delete()
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(self.article_url)['ETag']
+        self.create_and_log_in_user()
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.article_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_blog_page(self):
+        url = reverse('plok:blog', args=[self.blog.name])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Article.objects.create(blog=self.blog, created_by=self.creator, name="another_article")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_article_list(self):
+        url = reverse('plok:article_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.article.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_article_is_404(self):
+        response = self.client.get(reverse('plok:article', args=[self.blog.name, 'no_article']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,63 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from plok.models import Blog, Article
+
+
+class Feeds(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article", format='markdown', text='*Rendered*')
+
+    def test_reverse(self):
+        self.assertEqual(reverse('plok:feed_rss'), '/feed/rss/')
+        self.assertEqual(reverse('plok:feed_atom'), '/feed/atom/')
+        self.assertEqual(reverse('plok:blog_feed_rss', args=['test_blog']), '/plok/test_blog/feed/rss/')
+        self.assertEqual(reverse('plok:blog_feed_atom', args=['test_blog']), '/plok/test_blog/feed/atom/')
+
+    def test_feeds_contain_rendered_articles(self):
+        for url_name, args, content_type in [('plok:feed_rss', [], 'application/rss+xml'),
+                                             ('plok:feed_atom', [], 'application/atom+xml'),
+                                             ('plok:blog_feed_rss', ['test_blog'], 'application/rss+xml'),
+                                             ('plok:blog_feed_atom', ['test_blog'], 'application/atom+xml')]:
+            response = self.client.get(reverse(url_name, args=args))
+            self.assertTrue(response['Content-Type'].startswith(content_type))
+            self.assertContains(response, 'Test article')
+            self.assertContains(response, '&lt;em&gt;Rendered&lt;/em&gt;')
+
+    def test_blog_feed_only_has_blog_articles(self):
+        other = Blog.objects.create(created_by=self.creator, name="other_blog", title="Other blog")
+        Article.objects.create(blog=other, created_by=self.creator, name="other_article", title="Other article")
+        response = self.client.get(reverse('plok:blog_feed_atom', args=[self.blog.name]))
+        self.assertNotContains(response, 'Other article')
+        response = self.client.get(reverse('plok:feed_atom'))
+        self.assertContains(response, 'Other article')
+
+    def test_cached_until_article_changes(self):
+        url = reverse('plok:feed_rss')
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        Article.objects.create(blog=self.blog, created_by=self.creator, name="new_article", title="New article")
+        response = self.client.get(url)
+        self.assertContains(response, 'New article')
+        self.assertNotEqual(cached['ETag'], response['ETag'])
+
+    def test_conditional_get(self):
+        url = reverse('plok:blog_feed_atom', args=[self.blog.name])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_404_no_blog(self):
+        response = self.client.get(reverse('plok:blog_feed_rss', args=['no_blog']))
+        self.assertEqual(response.status_code, 404)
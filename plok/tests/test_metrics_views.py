@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from plok import metrics
+from plok.cache import page_cache_stats
+from plok.models import Blog, Article
+from .ext_test_case import ExtTestCase
+
+
+class MetricsTests(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        metrics._metrics = metrics.Metrics()
+        metrics._pid = os.getpid()
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        Article.objects.create(blog=blog, created_by=creator, name="test_article", title="Test article")
+        self.article_url = reverse('plok:article', args=['test_blog', 'test_article'])
+
+    def test_records_requests_by_view(self):
+        self.client.get(self.article_url)
+        self.client.get(self.article_url)
+        self.client.get('/plok/test_blog/no_such_article/')
+        response = self.client.get(reverse('plok:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn('plok_request_duration_seconds_count{view="plok:article"} 3', text)
+        self.assertIn('plok_request_duration_seconds_bucket{view="plok:article",le="+Inf"} 3', text)
+        self.assertIn('plok_responses_total{view="plok:article",status="200"} 2', text)
+        self.assertIn('plok_responses_total{view="plok:article",status="404"} 1', text)
+        self.assertIn('plok_page_cache_requests_total{result="hit"} 1', text)
+        self.assertIn('plok_page_cache_requests_total{result="miss"} 1', text)
+        self.assertIn('plok_page_cache_hit_ratio 0.5000', text)
+        self.assertRegex(text, r'plok_queries_total\{view="plok:article"\} [1-9]')
+
+    def test_sums_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = {'requests': {'plok:article': [[1] + [0] * len(metrics.BUCKETS), 0.001]},
+                     'responses': {'plok:article 200': 1}, 'queries': {'plok:article': 4},
+                     'page_cache': {'HIT': 1}}
+            with open(os.path.join(directory, '1.json'), 'w') as other_file:
+                json.dump(other, other_file)
+            with override_settings(PLOK_METRICS_DIR=directory, PLOK_METRICS_FLUSH_INTERVAL=0):
+                self.client.get(self.article_url)
+                self.assertTrue(os.path.exists(os.path.join(directory, '{}.json'.format(os.getpid()))))
+                text = self.client.get(reverse('plok:metrics')).content.decode()
+        self.assertIn('plok_request_duration_seconds_count{view="plok:article"} 2', text)
+        self.assertIn('plok_responses_total{view="plok:article",status="200"} 2', text)
+        self.assertIn('plok_page_cache_requests_total{result="hit"} 1', text)
+        self.assertIn('plok_page_cache_requests_total{result="miss"} 1', text)
+
+    def test_reading_leaves_no_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '1.json'), 'w') as other_file:
+                json.dump({'page_cache': {'HIT': 3, 'MISS': 1}}, other_file)
+            with override_settings(PLOK_METRICS_DIR=directory):
+                self.assertEqual(page_cache_stats(), {'hits': 3, 'misses': 1, 'hit_ratio': 0.75})
+                metrics._flush_at_exit()
+            self.assertEqual(os.listdir(directory), ['1.json'])
+
+    def test_histogram_buckets(self):
+        recorder = metrics.Metrics()
+        recorder.record('view', 200, 0.003, 1)
+        recorder.record('view', 200, 0.3, 2)
+        recorder.record('view', 500, 10.0, 0)
+        text = metrics.render_text(recorder.as_dict())
+        self.assertIn('plok_request_duration_seconds_bucket{view="view",le="0.005"} 1', text)
+        self.assertIn('plok_request_duration_seconds_bucket{view="view",le="0.25"} 1', text)
+        self.assertIn('plok_request_duration_seconds_bucket{view="view",le="0.5"} 2', text)
+        self.assertIn('plok_request_duration_seconds_bucket{view="view",le="+Inf"} 3', text)
+        self.assertIn('plok_queries_total{view="view"} 3', text)
+        self.assertIn('plok_responses_total{view="view",status="500"} 1', text)
@@ -0,0 +1,148 @@
+import os
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from plok import metrics
+from plok.cache import page_cache_stats
+from plok.models import Blog, Article, Comment
+from plok.pagination import encode_cursor
+from .ext_test_case import ExtTestCase
+
+
+class AnonymousPageCache(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        metrics._metrics = metrics.Metrics()
+        metrics._pid = os.getpid()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article", text="Original text")
+        self.article_url = reverse('plok:article', args=[self.blog.name, self.article.name])
+        self.blog_url = reverse('plok:blog', args=[self.blog.name])
+
+    def test_second_request_is_served_from_cache(self):
+        response = self.client.get(self.article_url)
+        self.assertEqual(response['X-Plok-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.article_url)
+        self.assertEqual(response['X-Plok-Cache'], 'HIT')
+        self.assertContains(response, 'Original text')
+        self.assertEqual(page_cache_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_logged_in_users_are_not_cached(self):
+        self.create_and_log_in_user()
+        self.client.get(self.article_url)
+        response = self.client.get(self.article_url)
+        self.assertNotIn('X-Plok-Cache', response)
+
+    def test_varies_by_language(self):
+        self.client.get(self.blog_url)
+        self.client.cookies.load({settings.LANGUAGE_COOKIE_NAME: 'en-us'})
+        response = self.client.get(self.blog_url)
+        self.assertEqual(response['X-Plok-Cache'], 'MISS')
+
+    def test_varies_by_page_but_not_by_other_parameters(self):
+        self.client.get(self.blog_url)
+        after = '?after=' + encode_cursor(self.article)
+        response = self.client.get(self.blog_url + after)
+        self.assertEqual(response['X-Plok-Cache'], 'MISS')
+        for junk in ('?utm_source=1', after + '&utm_source=1'):
+            response = self.client.get(self.blog_url + junk)
+            self.assertNotIn('X-Plok-Cache', response)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(page_cache_stats()['misses'], 2)
+
+    def test_csrf_token_is_not_shared(self):
+        self.client.get(self.article_url)
+        response = self.client.get(self.article_url)
+        self.assertEqual(response['X-Plok-Cache'], 'HIT')
+        self.assertNotContains(response, '\x00')
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_article_change_invalidates_article_and_blog_pages(self):
+        self.client.get(self.article_url)
+        self.client.get(self.blog_url)
+        self.article.title = 'Updated article'
+        self.article.save()
+        response = self.client.get(self.article_url)
+        self.assertEqual(response['X-Plok-Cache'], 'MISS')
+        self.assertContains(response, 'Updated article')
+        response = self.client.get(self.blog_url)
+        self.assertEqual(response['X-Plok-Cache'], 'MISS')
+        self.assertContains(response, 'Updated article')
+
+    def test_comment_change_invalidates_article_page_only(self):
+        self.client.get(self.article_url)
+        self.client.get(self.blog_url)
+        comment = Comment.objects.create(article=self.article, created_by=self.creator, text='New comment')
+        response = self.client.get(self.article_url)
+        self.assertContains(response, 'New comment')
+        self.assertEqual(self.client.get(self.blog_url)['X-Plok-Cache'], 'HIT')
+        comment.delete()
+        response = self.client.get(self.article_url)
+        self.assertNotContains(response, 'New comment')
+
+    def test_blog_change_invalidates_blog_and_article_pages(self):
+        self.client.get(self.article_url)
+        self.client.get(self.blog_url)
+        self.blog.title = 'Renamed blog'
+        self.blog.save()
+        self.assertEqual(self.client.get(self.article_url)['X-Plok-Cache'], 'MISS')
+        self.assertContains(self.client.get(self.blog_url), 'Renamed blog')
+
+    def test_deleted_article_is_not_served(self):
+        self.client.get(self.article_url)
+        self.article.delete()
+        response = self.client.get(self.article_url)
+        self.assertEqual(response.status_code, 404)
+
+
+class FragmentCache(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article", text="Original text")
+        self.comment = Comment.objects.create(article=self.article, created_by=self.creator, text='Creator comment')
+        self.article_url = reverse('plok:article', args=[self.blog.name, self.article.name])
+        self.edit_url = reverse('plok:comment_update', args=[self.blog.name, self.article.name, self.comment.id])
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.article_url)
+        return response, [query['sql'] for query in queries if 'plok_comment' in query['sql']]
+
+    def test_fragments_are_shared_by_logged_in_users(self):
+        user = self.create_and_log_in_user()
+        response, comment_queries = self.get()
+        self.assertEqual(len(comment_queries), 2)  # Conditional GET validators and the comments
+        self.assertContains(response, 'Creator comment')
+        self.assertNotContains(response, self.edit_url)
+
+        self.client.force_login(self.creator)
+        response, comment_queries = self.get()
+        self.assertEqual(len(comment_queries), 1)
+        self.assertContains(response, 'Creator comment')
+        self.assertContains(response, self.edit_url)  # Owner-only link picked from the cached fragment
+        self.assertNotContains(response, '\x00')
+
+        self.client.force_login(user)
+        Comment.objects.create(article=self.article, created_by=user, text='New comment')
+        response, comment_queries = self.get()
+        self.assertEqual(len(comment_queries), 2)
+        self.assertContains(response, 'New comment')
+        self.assertContains(response, 'Comments: 2')
+        self.assertNotContains(response, self.edit_url)
+
+    def test_owner_only_outside_fragment(self):
+        template = Template('{% load plok_cache %}{% owner_only owner %}Edit{% endowner_only %}')
+        self.assertEqual(template.render(Context({'owner': self.creator.id, 'user': self.creator})), 'Edit')
+        self.assertEqual(template.render(Context({'owner': self.creator.id, 'user': auth.models.AnonymousUser()})),
+                         '')
@@ -1,6 +1,7 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.contrib import auth
-from plok.models import Blog, Article, Comment
+from plok.models import Blog, Article, Comment, thread_comments, MAX_COMMENT_INDENT, repair_counts
+from plok.rendering import RENDERER_VERSION
 from .ext_test_case import ExtTestCase
 
 
@@ -61,6 +62,18 @@ class ArticleTests(ExtTestCase):
         with self.assertRaises(IntegrityError):
             article.save()
 
+    def test_html_rendered_on_save(self):
+        creator = auth.get_user_model().objects.create(username='creator')
+        blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
+        article = Article.objects.create(blog=blog, created_by=creator, name="test_article", text='# Title')
+        self.assertEqual(article.html, '# Title')
+        self.assertEqual(article.renderer_version, RENDERER_VERSION)
+        article.format = 'markdown'
+        article.save()
+        article = Article.objects.get(pk=article.pk)
+        self.assertEqual(article.html, '<h1>Title</h1>')
+        self.assertEqual(article.renderer_version, RENDERER_VERSION)
+
     def test_comments(self):
         creator = auth.get_user_model().objects.create(username='creator')
         blog = Blog.objects.create(created_by=creator, name="test_blog", title="Test blog")
@@ -95,3 +108,67 @@ class CommentTests(ExtTestCase):
         comment = Comment()
         with self.assertRaises(IntegrityError):
             comment.save()
+
+    def test_thread_deep_reply_chain(self):
+        comments = [Comment(id=i, reply_to_id=i - 1 if i > 1 else None) for i in range(1, 5001)]
+        thread = thread_comments(comments)
+        self.assertEqual(len(thread), 5000)
+        self.assertEqual(thread[-1].depth, 4999)
+        self.assertEqual(thread[-1].indent, MAX_COMMENT_INDENT)
+
+
+class CountTests(ExtTestCase):
+    def setUp(self):
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.other_blog = Blog.objects.create(created_by=self.creator, name="other_blog", title="Other blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article")
+
+    def counts(self):
+        return (list(Blog.objects.order_by('id').values_list('article_count', flat=True)),
+                list(Article.objects.order_by('id').values_list('comment_count', flat=True)))
+
+    def test_counts_follow_creates_moves_and_deletes(self):
+        article = Article.objects.create(blog=self.blog, created_by=self.creator, name="second_article")
+        comment = Comment.objects.create(article=self.article, created_by=self.creator, text='Comment')
+        reply = Comment.objects.create(article=self.article, reply_to=comment, created_by=self.creator, text='Re')
+        Comment.objects.create(article=self.article, reply_to=reply, created_by=self.creator, text='Re: Re')
+        Comment.objects.create(article=article, created_by=self.creator, text='Comment')
+        self.assertEqual(self.counts(), ([2, 0], [3, 1]))
+
+        self.blog.title = "Edited"  # Stale article_count in memory
+        self.blog.save()
+        reply.text = 'Edited'
+        reply.save()
+        article.blog = self.other_blog
+        article.save()
+        self.assertEqual(self.counts(), ([1, 1], [3, 1]))
+
+        reply.delete()  # And the reply to it
+        self.assertEqual(self.counts(), ([1, 1], [1, 1]))
+        self.article.delete()
+        self.assertEqual(self.counts(), ([0, 1], [1]))
+        self.other_blog.delete()
+        self.assertEqual(self.counts(), ([0], []))
+
+    def test_count_rolled_back_with_failed_save(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Comment.objects.create(article=self.article, created_by=self.creator, text='Comment')
+            Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article")
+        self.assertEqual(self.counts(), ([1, 0], [0]))
+
+    def test_delete_after_rows_inserted_past_the_signals(self):
+        comments = Comment.objects.bulk_create([Comment(article=self.article, created_by=self.creator, text='Bulk')
+                                                for i in range(2)])
+        Article.objects.bulk_create([Article(blog=self.blog, created_by=self.creator, name="bulk_article")])
+        Comment.objects.filter(pk__in=[comment.pk for comment in comments]).delete()
+        Article.objects.filter(blog=self.blog).delete()
+        self.assertEqual(self.counts(), ([0, 0], []))
+
+    def test_repair_counts(self):
+        Comment.objects.create(article=self.article, created_by=self.creator, text='Comment')
+        Blog.objects.update(article_count=5)
+        Article.objects.update(comment_count=0)
+        self.assertEqual(repair_counts(), (2, 1))
+        self.assertEqual(self.counts(), ([1, 0], [1]))
+        self.assertEqual(repair_counts(), (0, 0))
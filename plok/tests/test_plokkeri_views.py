@@ -1,6 +1,10 @@
+import os
+import tempfile
+from unittest import mock
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import translation
+from plok.about import render_about
 
 
 class IndexPage(TestCase):
@@ -31,6 +35,19 @@ class AboutPage(TestCase):
         response = self.client.get(reverse(self.url_name))
         self.assertTemplateUsed(response, 'plok/about.html')
 
+    def test_rendered_readme_is_cached_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'README.md')
+            with open(path, 'w') as readme:
+                readme.write('# First')
+            self.assertEqual(render_about(path), '<h1>First</h1>')
+            with mock.patch('plok.about.render_text') as render_text:
+                self.assertEqual(render_about(path), '<h1>First</h1>')
+            render_text.assert_not_called()
+            with open(path, 'w') as readme:
+                readme.write('# Second!')
+            self.assertEqual(render_about(path), '<h1>Second!</h1>')
+
 
 class ChangeLanguage(TestCase):
     url_name = 'set_language'
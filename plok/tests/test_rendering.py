@@ -0,0 +1,57 @@
+import os
+import random
+from unittest import mock
+import markdown
+from django.conf import settings
+from django.test import SimpleTestCase
+from plok import rendering, synthetic
+
+PIECES = [
+    '# Heading', 'Heading\n=======', 'Paragraph with *em*, **strong** and `code`', 'Two\nlines', '- item\n- item',
+    '* loose\n\n* list', '1. one\n2. two', '    code\n    more', '> quote\n> more', '> quote\n\nafter', '---',
+    'Line  \nbreak', '- item\n\n    continued', 'Inline <span>HTML</span>', '[link](http://example.com)',
+    '  indented', '\tcode', 'x\n\n\n\ny', '+ plus', '1986. A year', '**unclosed', '`unclosed\n\nnext`',
+    'Windows\r\nline', '> a\n\n> b', '    code\n\n    code', 'Setext\n---', '___', '## h ##',
+]
+
+
+class MarkdownBlockRendering(SimpleTestCase):
+    def setUp(self):
+        rendering.block_cache.clear()
+
+    def assertSameAsMarkdown(self, text):
+        self.assertEqual(rendering.render_markdown(text), markdown.markdown(text), repr(text))
+
+    def test_same_output_as_single_pass(self):
+        rnd = random.Random(0)
+        for i in range(2000):
+            separator = rnd.choice(['\n', '\n\n', '\n\n\n', '\n \n'])
+            self.assertSameAsMarkdown(separator.join(rnd.choice(PIECES) for j in range(rnd.randint(1, 8))))
+        self.assertSameAsMarkdown(synthetic.markdown_text(rnd, 50))
+        with open(os.path.join(settings.BASE_DIR, 'README.md')) as readme:
+            self.assertSameAsMarkdown(readme.read())
+        self.assertSameAsMarkdown('')
+
+    def test_only_changed_blocks_are_rendered(self):
+        text = '# Title\n\nFirst paragraph.\n\nSecond paragraph.'
+        rendering.render_markdown(text)
+        self.assertEqual(len(rendering.block_cache), 3)
+        with mock.patch.object(markdown.Markdown, 'convert', autospec=True,
+                               side_effect=markdown.Markdown.convert) as convert:
+            html = rendering.render_markdown(text.replace('Second', 'Edited'))
+        self.assertEqual([call.args[1] for call in convert.call_args_list], ['Edited paragraph.'])
+        self.assertIn('<p>Edited paragraph.</p>', html)
+
+    def test_cross_block_constructs_rendered_in_one_pass(self):
+        for text in ['See [the docs][docs].\n\nMore text.\n\n[docs]: http://example.com',
+                     '<div>\n\nRaw *HTML*\n\n</div>\n\nText']:
+            self.assertSameAsMarkdown(text)
+        self.assertEqual(len(rendering.block_cache), 0)
+
+    def test_cache_is_bounded(self):
+        cache = rendering.BlockCache(2)
+        for key in 'abc':
+            cache.set(key, key.upper())
+        cache.get('b')
+        cache.set('d', 'D')
+        self.assertEqual(list(cache.blocks), ['b', 'd'])
@@ -0,0 +1,104 @@
+from unittest import mock
+from django.contrib import auth
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.urls import reverse
+from plok.cache import AnonymousPageCacheMixin
+from plok.models import Blog, Article
+from plok.routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, use_replica_for
+
+
+# 'default' stands in for the replica, random.choice is mocked to see whether a replica was picked.
+# TransactionTestCase, because reads inside a transaction always go to the primary. Settings are
+# overridden per test, as flushing the database between tests skips tables that replicas don't migrate.
+replica = override_settings(PLOK_READ_REPLICAS=['default'])
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.user, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.user, name="test_article",
+                                              title="Test article")
+        self.article_url = reverse('plok:article', args=[self.blog.name, self.article.name])
+
+    def get(self, url):
+        with mock.patch('plok.routers.random.choice', return_value='default') as choice:
+            response = self.client.get(url)
+        return response, choice.called
+
+    @replica
+    def test_read_views_use_replica(self):
+        for url in [self.article_url, reverse('plok:blog', args=[self.blog.name]), reverse('plok:blog_list'),
+                    reverse('plok:article_list')]:
+            response, used_replica = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(used_replica, url)
+
+    @replica
+    def test_pages_from_replica_are_cached_briefly(self):
+        with mock.patch.object(AnonymousPageCacheMixin, '_store_page', return_value=None) as store_page:
+            self.get(self.article_url)
+        self.assertEqual(store_page.call_args[0][2], 10)
+
+    @replica
+    def test_other_views_use_primary(self):
+        response, used_replica = self.get(reverse('plok:search') + '?q=test')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(used_replica)
+
+    @replica
+    def test_writer_is_pinned_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('plok:comment_create', args=[self.blog.name, self.article.name]),
+                                    {'text': 'Comment'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, used_replica = self.get(self.article_url)
+        self.assertContains(response, 'Comment')
+        self.assertFalse(used_replica)
+
+        del self.client.cookies[PIN_COOKIE]
+        response, used_replica = self.get(self.article_url)
+        self.assertTrue(used_replica)
+
+    @replica
+    def test_one_replica_per_request(self):
+        with mock.patch('plok.routers.random.choice', return_value='default') as choice:
+            response = self.client.get(self.article_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(choice.call_count, 1)
+
+    def test_router_reads_from_the_replica_of_the_request(self):
+        router = ReplicaRouter()
+        request = RequestFactory().get('/')
+        seen = []
+
+        def view(request):
+            use_replica_for(request)
+            seen.extend(router.db_for_read(Article) for i in range(20))
+            return HttpResponse()
+
+        with override_settings(PLOK_READ_REPLICAS=['replica1', 'replica2', 'replica3']):
+            ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(len(set(seen)), 1)
+        self.assertIn(seen[0], ['replica1', 'replica2', 'replica3'])
+        self.assertIsNone(router.db_for_read(Article))
+
+    def test_no_replicas(self):
+        response, used_replica = self.get(self.article_url)
+        self.assertFalse(used_replica)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('plok:comment_create', args=[self.blog.name, self.article.name]),
+                                    {'text': 'Comment'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Article))
+        self.assertEqual(router.db_for_write(Article), 'default')
+        with override_settings(PLOK_READ_REPLICAS=['replica']):
+            self.assertTrue(router.allow_migrate('default', 'plok'))
+            self.assertFalse(router.allow_migrate('replica', 'plok'))
@@ -0,0 +1,59 @@
+from io import StringIO
+from django.contrib import auth
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from plok.models import Blog, Article
+from plok.search import search_articles, FTS_TABLE
+
+
+class SearchPage(TestCase):
+    url_name = 'plok:search'
+
+    def setUp(self):
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+
+    def create_article(self, name, title, text=''):
+        return Article.objects.create(blog=self.blog, created_by=self.creator, name=name, title=title, text=text)
+
+    def test_reverse(self):
+        self.assertEqual(reverse(self.url_name), '/search/')
+
+    def test_uses_correct_template(self):
+        response = self.client.get(reverse(self.url_name))
+        self.assertTemplateUsed(response, 'plok/search.html')
+        self.assertEqual(list(response.context['results']), [])
+
+    def test_finds_ranked_and_highlighted_articles(self):
+        in_text = self.create_article('in_text', 'Something else', text='All about <b>sauna</b> evenings')
+        in_title = self.create_article('in_title', 'Sauna tips', text='Heat')
+        self.create_article('unrelated', 'Skiing', text='Snow')
+        response = self.client.get(reverse(self.url_name), {'q': 'sauna'})
+        self.assertEqual(response.context['results'], [in_title, in_text])
+        self.assertContains(response, '<mark>Sauna</mark> tips')
+        self.assertContains(response, 'All about <mark>sauna</mark> evenings')
+
+    def test_index_follows_updates_and_deletes(self):
+        article = self.create_article('article', 'Sauna')
+        article.title = 'Avanto'
+        article.save()
+        self.assertEqual(search_articles('sauna'), [])
+        self.assertEqual(search_articles('avanto'), [article])
+        article.delete()
+        self.assertEqual(search_articles('avanto'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_article('article', 'Sauna')
+        self.assertEqual(len(search_articles('sauna" OR NEAR(')), 0)
+        self.assertEqual(len(search_articles('"sauna"')), 1)
+        self.assertEqual(search_articles('*'), [])
+
+    def test_rebuild_command(self):
+        article = self.create_article('article', 'Sauna')
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO {0}({0}) VALUES ('delete-all')".format(FTS_TABLE))
+        self.assertEqual(search_articles('sauna'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search_articles('sauna'), [article])
@@ -0,0 +1,56 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from plok.models import Blog, Article
+from plok.timing import RequestTimings
+from .ext_test_case import ExtTestCase
+
+
+def metrics(response):
+    """ Server-Timing header as {name: {'dur': ..., 'desc': ...}} """
+    result = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        result[name] = dict(param.split('=', 1) for param in params)
+    return result
+
+
+class ServerTimingTests(ExtTestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = auth.get_user_model().objects.create(username='creator')
+        self.blog = Blog.objects.create(created_by=self.creator, name="test_blog", title="Test blog")
+        self.article = Article.objects.create(blog=self.blog, created_by=self.creator, name="test_article",
+                                              title="Test article", format='markdown', text="*Text*")
+
+    def test_article_page_reports_sql_and_template_time(self):
+        self.create_and_log_in_user()
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('plok:article', args=[self.blog.name, self.article.name]))
+        timing = metrics(response)
+        self.assertEqual(timing['sql']['desc'], '"6 queries"')
+        self.assertIn('template', timing)
+        self.assertNotIn('markdown', timing)  # Rendered when saved
+        self.assertGreaterEqual(float(timing['total']['dur']), float(timing['template']['dur']))
+
+    def test_markdown_rendering_is_timed(self):
+        user = self.create_and_log_in_user()
+        Article.objects.filter(pk=self.article.pk).update(created_by=user)
+        response = self.client.post(reverse('plok:article_update', args=[self.blog.name, self.article.name]), {
+            'title': 'Title', 'format': 'markdown', 'text': '*Edited*'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(metrics(response)['markdown']['desc'], '"1 renders"')
+
+    @override_settings(DEBUG=False)
+    def test_works_without_debug(self):
+        response = self.client.get(reverse('plok:blog_list'))
+        self.assertEqual(metrics(response)['sql']['desc'], '"1 queries"')
+
+    def test_header_format(self):
+        timings = RequestTimings()
+        timings.add('sql', 0.002)
+        timings.add('sql', 0.001)
+        timings.add('markdown', 0.0105)
+        self.assertEqual(timings.header(0.02),
+                         'sql;dur=3.0;desc="2 queries", markdown;dur=10.5;desc="1 renders", total;dur=20.0')
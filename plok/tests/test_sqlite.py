@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from plok.sqlite import configure_sqlite
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+
+    @override_settings(PLOK_SQLITE_PRAGMAS={'cache_size': -4096})
+    def test_configure_from_settings(self):
+        configure_sqlite(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4096)
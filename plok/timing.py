@@ -0,0 +1,117 @@
+import contextlib
+import contextvars
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('plok_request_timings', default=None)
+
+
+class RequestTimings:
+    """ Time spent per category during one request, collected by ServerTimingMiddleware """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, category, duration):
+        self.durations[category] = self.durations.get(category, 0.0) + duration
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    def header(self, total):
+        """ Server-Timing header value, durations in milliseconds """
+        metrics = []
+        for category, description in (('sql', 'queries'), ('markdown', 'renders'), ('template', 'templates')):
+            if category in self.counts:
+                metrics.append('{};dur={:.1f};desc="{} {}"'.format(
+                    category, self.durations[category] * 1000, self.counts[category], description))
+        metrics.append('total;dur={:.1f}'.format(total * 1000))
+        return ', '.join(metrics)
+
+
+def current():
+    """ RequestTimings of the request being handled, or None """
+    return _current.get()
+
+
+@contextlib.contextmanager
+def timed(category):
+    """ Add the duration of the block to the current request, if any. Cheap outside requests. """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(category, time.perf_counter() - start)
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    connection_created handler. The wrapper stays on the connection and only records while a request
+    is being timed, which also covers queries that async views run in sync_to_async threads.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class ServerTimingMiddleware:
+    """
+    Report SQL, Markdown and template rendering time of each request in a Server-Timing header (shown
+    by browser developer tools), and in the plok.timing log if PLOK_SERVER_TIMING_LOG is set. Works
+    without DEBUG: queries are timed with a database execute wrapper, not connection.queries.
+    Template time includes queries run from templates. Should be first in MIDDLEWARE, so that
+    process_template_response runs last, just before the template is rendered.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.log = getattr(settings, 'PLOK_SERVER_TIMING_LOG', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        response['Server-Timing'] = timings.header(total)
+        if self.log:
+            logger.info('%s %s %s %s', request.method, request.path, response.status_code, response['Server-Timing'])
+        return response
+
+    def process_template_response(self, request, response):
+        timings = _current.get()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add('template', time.perf_counter() - start))
+        return response
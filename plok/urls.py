@@ -1,9 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth.decorators import login_required
-from .blog import BlogList, BlogDetail, BlogCreate, BlogUpdate, BlogDelete
+from .blog import BlogList, BlogDetail, BlogCreate, BlogUpdate, BlogDelete, BlogExport
 from .article import ArticleList, ArticleDetail, ArticleCreate, ArticleUpdate, ArticleDelete
 from .comment import CommentCreate, CommentUpdate, CommentDelete
 from .about import AboutView
+from .async_views import AsyncArticleList, AsyncArticleDetail, AsyncBlogDetail, AsyncAboutView
+from .search import SearchView
+from .metrics import metrics_view
+from .feeds import LatestArticlesFeed, LatestArticlesAtomFeed, BlogArticlesFeed, BlogArticlesAtomFeed
 
 
 app_name = 'plok'
@@ -12,10 +17,17 @@ urlpatterns = [
     path('list/', BlogList.as_view(), name='blog_list'),
     path('article_list/', ArticleList.as_view(), name='article_list'),
     path('about/', AboutView.as_view(), name='about'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('feed/rss/', LatestArticlesFeed(), name='feed_rss'),
+    path('feed/atom/', LatestArticlesAtomFeed(), name='feed_atom'),
     path('plok/<slug:slug>/update/', login_required(BlogUpdate.as_view()), name='blog_update'),
     path('plok/<slug:slug>/delete/', login_required(BlogDelete.as_view()), name='blog_delete'),
+    path('plok/<slug:slug>/export/', login_required(BlogExport.as_view()), name='blog_export'),
     path('plok/<slug:blog_name>/create_article/', login_required(ArticleCreate.as_view()), name='article_create'),
     path('plok/<slug:slug>/', BlogDetail.as_view(), name='blog'),
+    path('plok/<slug:slug>/feed/rss/', BlogArticlesFeed(), name='blog_feed_rss'),
+    path('plok/<slug:slug>/feed/atom/', BlogArticlesAtomFeed(), name='blog_feed_atom'),
     path('plok/<slug:blog_name>/<slug:slug>/delete/',
          login_required(ArticleDelete.as_view()), name='article_delete'),
     path('plok/<slug:blog_name>/<slug:slug>/update/',
@@ -29,3 +41,21 @@ urlpatterns = [
     path('plok/<slug:blog_name>/<slug:slug>/', ArticleDetail.as_view(), name='article'),
     path('', ArticleList.as_view(), name='index'),
 ]
+
+ASYNC_VIEWS = {
+    'index': AsyncArticleList,
+    'article_list': AsyncArticleList,
+    'article': AsyncArticleDetail,
+    'blog': AsyncBlogDetail,
+    'about': AsyncAboutView,
+}
+
+
+def with_async_views(patterns):
+    """ patterns with the read views replaced by their async versions """
+    return [path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+            if pattern.name in ASYNC_VIEWS else pattern for pattern in patterns]
+
+
+if getattr(settings, 'PLOK_ASYNC_VIEWS', False):  # Set when served through ASGI, see plokkeri/asgi.py
+    urlpatterns = with_async_views(urlpatterns)
@@ -0,0 +1,110 @@
+"""
+Work that Django and plok otherwise do lazily on the first requests of each worker: importing views
+and populating URL resolvers, compiling templates, loading translation catalogs and setting up
+Markdown. plokkeri/wsgi.py and plokkeri/asgi.py call preload() when PLOK_WARMUP is on. With
+gunicorn --preload that happens once in the master, and the forked workers share the memory
+copy-on-write. Without it every worker warms up when it starts, before taking requests.
+
+No database connections are opened, they must not be shared by forked workers.
+"""
+import gc
+import logging
+import os
+import time
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import translation
+from plok import rendering
+from plok.about import render_about
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_APPS = ('plok', 'users')  # Templates of other apps are compiled when first used
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+MARKDOWN_SAMPLE = '# Title\n\nText with *emphasis*, `code` and a [link](http://example.com).\n\n- item\n\n> quote'
+
+
+def _urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # Imports every URLconf and view module, and indexes the patterns
+    resolver.namespace_dict
+    return '{} patterns'.format(len(resolver.url_patterns))
+
+
+def _template_names():
+    directories = [directory for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    directories += [os.path.join(apps.get_app_config(label).path, 'templates') for label in TEMPLATE_APPS]
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            for name in sorted(files):
+                if name.endswith(TEMPLATE_EXTENSIONS):
+                    yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def _templates():
+    names = sorted(set(_template_names()))
+    for name in names:
+        get_template(name)  # Kept compiled by the cached template loader
+    return '{} templates'.format(len(names))
+
+
+def _translations():
+    # Every language a reader can pick, not just those with a catalog in LOCALE_PATHS: the others
+    # still load the catalogs of Django and the apps.
+    languages = {settings.LANGUAGE_CODE} | {code for code, name in settings.LANGUAGES}
+    for language in sorted(languages):
+        with translation.override(language):
+            translation.gettext('Comments')  # Loads and merges the catalogs of every app
+    return ', '.join(sorted(languages))
+
+
+def _markdown():
+    # The converter is per thread. Gunicorn workers serve from the thread that forked them.
+    rendering._converter().convert(MARKDOWN_SAMPLE)
+    return rendering.RENDERER_VERSION
+
+
+def _about():
+    render_about(os.path.join(settings.BASE_DIR, 'README.md'))
+    return 'README.md'
+
+
+STEPS = [
+    ('urls', _urls),
+    ('templates', _templates),
+    ('translations', _translations),
+    ('markdown', _markdown),
+    ('about', _about),
+]
+
+
+def warm_up():
+    """ Run each step, returns [(step, seconds, what was warmed)] """
+    report = []
+    for name, step in STEPS:
+        start = time.perf_counter()
+        detail = step()
+        report.append((name, time.perf_counter() - start, detail))
+    return report
+
+
+def format_report(report):
+    lines = ['{:<14} {:>8.1f} ms  {}'.format(name, seconds * 1000, detail) for name, seconds, detail in report]
+    lines.append('{:<14} {:>8.1f} ms'.format('total', sum(seconds for name, seconds, detail in report) * 1000))
+    return '\n'.join(lines)
+
+
+def preload():
+    """
+    Warm up, then move everything allocated so far out of the garbage collector's reach. Collections
+    in the workers would otherwise write to every object's header and un-share the pages.
+    """
+    report = warm_up()
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    logger.info('Warmed up in process %s:\n%s', os.getpid(), format_report(report))
+    return report
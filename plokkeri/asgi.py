@@ -0,0 +1,24 @@
+"""
+ASGI config for plokkeri project.
+
+It exposes the ASGI callable as a module-level variable named ``application``. Served with gunicorn
+and uvicorn workers, e.g. ``gunicorn plokkeri.asgi:application -k uvicorn.workers.UvicornWorker``.
+The article, blog and about pages are served by the async views in plok.async_views.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "plokkeri.settings")
+os.environ.setdefault("PLOK_ASYNC_VIEWS", "1")
+
+application = get_asgi_application()
+
+if settings.PLOK_WARMUP:
+    from plok.warmup import preload
+    preload()  # In the gunicorn master with --preload, before workers are forked
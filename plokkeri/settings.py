@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 import os
 import sys
 
+from django.utils.translation import gettext_lazy as _
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 SETTINGS_DIR = os.path.dirname(os.path.abspath(__file__))
 BASE_DIR = os.path.dirname(SETTINGS_DIR)
@@ -58,7 +60,7 @@ INSTALLED_APPS = [
     'plok',
     'allauth',
     'allauth.account',
-    'allauth.socialaccount',
+    'users.apps.LazySocialAccountConfig',  # allauth.socialaccount, providers loaded on first use
     'allauth.socialaccount.providers.amazon',
     'allauth.socialaccount.providers.github',
     'allauth.socialaccount.providers.google',
@@ -66,12 +68,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'plok.timing.ServerTimingMiddleware',  # First, so that it sees the whole request and template rendering
+    'plok.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'users.accounts.SocialURLConfMiddleware',  # Before anything resolves URLs
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # Should come early, but after SessionMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'plok.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -104,6 +110,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'plokkeri.wsgi.application'
+ASGI_APPLICATION = 'plokkeri.asgi.application'
 
 
 # Database
@@ -113,9 +120,72 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'timeout': 20,  # Seconds to wait for another worker's write lock before "database is locked"
+        },
     }
 }
 
+if not DEBUG:
+    # Keep connections (and their SQLite page cache) across requests in each gunicorn worker
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read-only views (replica_reads = True) read from these aliases, see plok/routers.py. A user who has
+# posted something reads from the primary for PLOK_REPLICA_PIN_SECONDS. To try locally with a copy
+# of the database kept in sync by ./manage.py sync_replica --interval 1:
+# DATABASES['replica'] = dict(DATABASES['default'], NAME=os.path.join(BASE_DIR, 'replica.sqlite3'),
+#                             TEST={'MIRROR': 'default'})
+# PLOK_READ_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['plok.routers.ReplicaRouter']
+PLOK_READ_REPLICAS = []
+PLOK_REPLICA_PIN_SECONDS = 10
+
+# Applied to every new SQLite connection (plok/sqlite.py). In WAL mode readers don't block the writer
+# and the writer doesn't block readers. synchronous=NORMAL is safe with WAL: a power loss can lose the
+# last commits but not corrupt the database.
+PLOK_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Production cache is shared by all gunicorn workers, so that invalidation (plok/signals.py) reaches every worker
+
+# Tests get their own cache and metrics, also when run on the server with production settings
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+if DEBUG or TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(SITE_DIR, 'cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+PLOK_PAGE_CACHE_TIMEOUT = 24 * 60 * 60  # Anonymous article and blog pages, invalidated on change
+PLOK_FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60  # Article body and comments for all users, see plok/templatetags
+PLOK_MARKDOWN_BLOCK_CACHE_SIZE = 5000  # Rendered Markdown blocks kept per process, see plok/rendering.py
+PLOK_SERVER_TIMING_LOG = False  # Also log the Server-Timing header of every request to plok.timing
+# Per worker metric files, summed by /metrics. Without a directory /metrics only shows its own process.
+PLOK_METRICS_DIR = None if DEBUG or TESTING else os.path.join(SITE_DIR, 'metrics')
+PLOK_METRICS_FLUSH_INTERVAL = 5  # Seconds
+# Serve article, blog and about pages with the async views of plok.async_views. Set by plokkeri/asgi.py.
+PLOK_ASYNC_VIEWS = os.environ.get('PLOK_ASYNC_VIEWS') == '1'
+PLOK_WARMUP = not DEBUG  # Warm up when the WSGI/ASGI application is loaded, see plok/warmup.py
+
 # Needed since Django 3.2:
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
@@ -142,10 +212,11 @@ LOCALE_PATHS = [
     '{}/locale'.format(BASE_DIR),
 ]
 
-# LANGUAGES = [
-#    ('en-us', _('English')),
-#    ('fi', _('Finnish')),
-#]
+# The languages with a translation, the ones the navbar offers
+LANGUAGES = [
+    ('fi', _('Finnish')),
+    ('en', _('English')),
+]
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.11/howto/static-files/
@@ -211,6 +282,14 @@ LOGGING = {
         'django': {
             'handlers': ['console', 'file', 'mail_admins'],
             'level': 'INFO',
+        },
+        'plok.timing': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+        },
+        'plok.warmup': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
         }
     }
 }
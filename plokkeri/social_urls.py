@@ -0,0 +1,6 @@
+"""
+URLconf of requests to accounts/, with the social login providers' URLs. See users/accounts.py.
+"""
+from plokkeri.urls import site_urls
+
+urlpatterns = site_urls('allauth.urls')
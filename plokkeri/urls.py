@@ -15,12 +15,20 @@ Including another URLconf
 """
 from django.urls import include, path
 from django.contrib import admin
+from users.accounts import ACCOUNT_URLS
 # from django.conf.urls.i18n import i18n_patterns
 
-urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("accounts/", include('allauth.urls')),
-    path("i18n/", include('django.conf.urls.i18n')),
-    path("", include('users.urls')),
-    path("", include('plok.urls', namespace='plok')),
-]
+
+def site_urls(accounts):
+    return [
+        path("admin/", admin.site.urls),
+        path("accounts/", include(accounts)),
+        path("i18n/", include('django.conf.urls.i18n')),
+        path("", include('users.urls')),
+        path("", include('plok.urls', namespace='plok')),
+    ]
+
+
+# Without the URLs of the social login providers, requests to accounts/ use plokkeri.social_urls
+# (see users/accounts.py)
+urlpatterns = site_urls(ACCOUNT_URLS)
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "plokkeri.settings")
 
 application = get_wsgi_application()
+
+if settings.PLOK_WARMUP:
+    from plok.warmup import preload
+    preload()  # In the gunicorn master with --preload, before workers are forked
@@ -0,0 +1,45 @@
+"""
+allauth's accounts/ URLs without loading the social login providers for every request. The root
+URLconf (plokkeri.urls) has the account and social account management URLs, so pages can reverse
+login and signup links. Requests to accounts/ are served with plokkeri.social_urls instead, which
+includes allauth.urls with the URLs of the providers. Importing those imports the providers
+(see users/apps.py), and with them requests and the OAuth views.
+"""
+from allauth.socialaccount.providers import registry
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import include, path
+
+ACCOUNT_URLS = [
+    path("", include('allauth.account.urls')),
+    path("3rdparty/", include('allauth.socialaccount.urls')),
+]
+SOCIAL_URLCONF = 'plokkeri.social_urls'
+SOCIAL_PATHS = ('/accounts/', '/admin/socialaccount/')  # The admin lists accounts by provider
+
+
+class SocialURLConfMiddleware:
+    """ Serve accounts/ with the URLconf that has the provider URLs, loading the providers first """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.route(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.route(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def route(request):
+        if request.path_info.startswith(SOCIAL_PATHS):
+            registry.load()
+            if request.path_info.startswith('/accounts/'):
+                request.urlconf = SOCIAL_URLCONF
@@ -0,0 +1,17 @@
+import allauth
+from allauth.socialaccount.apps import SocialAccountConfig
+
+# Versions whose SocialAccountConfig.ready() only loads the provider registry
+LAZY_PROVIDER_VERSIONS = ('0.63.',)
+
+
+class LazySocialAccountConfig(SocialAccountConfig):
+    """
+    allauth.socialaccount without importing the social login providers at start-up. Their modules
+    pull in requests and the OAuth views, a good part of a worker's start-up time and memory, and most
+    requests never need them. They are loaded for requests to accounts/ (see users/accounts.py).
+    Other allauth versions may do more in ready(), so they get it as is.
+    """
+    def ready(self):
+        if not allauth.__version__.startswith(LAZY_PROVIDER_VERSIONS):
+            super(LazySocialAccountConfig, self).ready()
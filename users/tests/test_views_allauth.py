@@ -1,7 +1,9 @@
 from django.test import TestCase
 from django.conf import settings
-from django.urls import reverse
+from django.urls import NoReverseMatch, resolve, reverse
 from django.contrib import auth
+from allauth.socialaccount.providers import registry
+from users.accounts import SOCIAL_URLCONF
 from .ext_test_case import ExtTestCase
 
 # Django allauth views:
@@ -96,3 +98,20 @@ class SocialConnectionsTest(ExtTestCase):
     def test_redirect_to_login_if_not_logged_in(self):
         response = self.client.get(reverse('socialaccount_connections'), follow=True)
         self.assertTemplateUsed(response, 'account/login.html')
+
+
+class LazySocialProvidersTest(TestCase):
+    def test_provider_urls_only_in_social_urlconf(self):
+        self.assertEqual(reverse('account_login'), '/accounts/login/')
+        with self.assertRaises(NoReverseMatch):
+            reverse('github_login')
+        self.assertEqual(resolve('/accounts/github/login/', urlconf=SOCIAL_URLCONF).url_name, 'github_login')
+        self.assertEqual(reverse('github_login', urlconf=SOCIAL_URLCONF), '/accounts/github/login/')
+
+    def test_requests_to_accounts_use_social_urlconf(self):
+        response = self.client.get(reverse('account_login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.urlconf, SOCIAL_URLCONF)
+        self.assertEqual(registry.get_class('github').id, 'github')
+        response = self.client.get(reverse('plok:index'))
+        self.assertFalse(hasattr(response.wsgi_request, 'urlconf'))